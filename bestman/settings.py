@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from datetime import timedelta
 from pathlib import Path
+from typing import Optional
 import environ
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "core.metrics.RequestMetricsMiddleware",
 ]
 
 ROOT_URLCONF = "bestman.urls"
@@ -90,6 +92,49 @@ WSGI_APPLICATION = "bestman.wsgi.application"
 DATABASES = {
     "default": env.db(),
 }
+# Optional read replica of the primary. Matching, public profile and catalog
+# reads are served from it (see core.replicas), except for users who wrote
+# through the API in the last PIN_SECONDS: their reads stay on the primary so
+# they see their own writes. Pins are kept in the PIN_CACHE_ALIAS cache, which
+# must be shared by all processes (e.g. Redis) for pins to hold across them.
+DATABASE_REPLICA: Optional[str] = None
+if env("DATABASE_REPLICA_URL", default=""):
+    DATABASES["replica"] = env.db("DATABASE_REPLICA_URL")
+    # No test database of its own; tests read from the primary (see core.runner)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICA = "replica"
+# A separate database standing in for a lagging replica in the routing tests
+if env("DATABASE_TEST_REPLICA_URL", default=""):
+    DATABASES["test_replica"] = env.db("DATABASE_TEST_REPLICA_URL")
+DATABASE_REPLICA_PIN_SECONDS: int = env.int("DATABASE_REPLICA_PIN_SECONDS", default=10)  # type: ignore
+DATABASE_REPLICA_PIN_CACHE_ALIAS: str = env("DATABASE_REPLICA_PIN_CACHE_ALIAS", default="default")  # type: ignore
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+TEST_RUNNER = "core.runner.TestRunner"
+# On PostgreSQL, connections come from a psycopg 3 pool per process (and
+# database alias) instead of being opened for every request. MIN_SIZE
+# connections are kept open, at most MAX_SIZE are opened, and a request
+# waits up to TIMEOUT seconds for a free one before failing. Idle
+# connections above MIN_SIZE close after MAX_IDLE seconds and every
+# connection is replaced after MAX_LIFETIME seconds. Without the pool,
+# connections are kept for CONN_MAX_AGE seconds, with health checks.
+DATABASE_POOL: bool = env.bool("DATABASE_POOL", default=True)  # type: ignore
+for database in DATABASES.values():
+    if DATABASE_POOL and database["ENGINE"] == "django.db.backends.postgresql":
+        database.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": env.int("DATABASE_POOL_MIN_SIZE", default=1),
+            "max_size": env.int("DATABASE_POOL_MAX_SIZE", default=4),
+            "timeout": env.float("DATABASE_POOL_TIMEOUT", default=10.0),
+            "max_idle": env.float("DATABASE_POOL_MAX_IDLE", default=600.0),
+            "max_lifetime": env.float("DATABASE_POOL_MAX_LIFETIME", default=3600.0),
+        }
+    else:
+        database["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=0)
+        database["CONN_HEALTH_CHECKS"] = True
+
+CACHES = {
+    # e.g. locmemcache:// or filecache:///var/tmp/django_cache
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
 
 AUTH_USER_MODEL = "core.CustomUser"
 
@@ -106,14 +151,63 @@ ACCOUNT_AUTHENTICATION_METHOD = "email"
 ACCOUNT_UNIQUE_EMAIL = True
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",)
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "rest_framework_simplejwt.authentication.JWTAuthentication",
+    ),
+    # DRF's defaults, with JSON handled by orjson when it is installed
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # Issue tokens with the claims core.authentication.StatelessJWTAuthentication trusts
+    "TOKEN_OBTAIN_SERIALIZER": "core.serializers.UserClaimsTokenObtainPairSerializer",
 }
 
+# Seconds a process serves its cached interest catalog before re-rendering it,
+# bounding how long catalog edits made in other processes stay invisible
+CATALOG_CACHE_MAX_AGE: int = env.int("CATALOG_CACHE_MAX_AGE", default=300)  # type: ignore
+
+# Measure SQL and serializer time of every request, report it in Server-Timing
+# headers (including the slowest statement's SQL) and serve per-view histograms
+# on api/metrics/ for staff
+REQUEST_METRICS: bool = env.bool("REQUEST_METRICS", default=False)  # type: ignore
+
+# Matching
+# Serve common-interest matches from the in-memory inverted index. While the
+# index is cold (or older than the max age, in seconds) requests use SQL.
+MATCHING_INTEREST_INDEX: bool = env.bool("MATCHING_INTEREST_INDEX", default=False)  # type: ignore
+MATCHING_INTEREST_INDEX_MAX_AGE: int = env.int("MATCHING_INTEREST_INDEX_MAX_AGE", default=300)  # type: ignore
+# Maintain matching.SharedInterestPair on every interest write and read matches
+# from it. Run `manage.py rebuild_shared_interest_pairs` after switching it on.
+MATCHING_SHARED_INTEREST_PAIRS: bool = env.bool("MATCHING_SHARED_INTEREST_PAIRS", default=False)  # type: ignore
+# PostgreSQL only: keep matching.UserInterestSet arrays in sync with interest
+# writes and find matches with a GIN-indexed overlap. Run
+# `manage.py backfill_interest_sets` if it was off while interests changed.
+MATCHING_INTEREST_ARRAYS: bool = env.bool("MATCHING_INTEREST_ARRAYS", default=False)  # type: ignore
+# Approximate the shared-count ranking with MinHash LSH: only users colliding
+# with the requester in one of BANDS buckets (of ROWS signature values each)
+# are considered, at most CANDIDATES of them, then scored exactly. Run
+# `manage.py rebuild_minhash_bands` after switching it on or changing the shape.
+MATCHING_LSH: bool = env.bool("MATCHING_LSH", default=False)  # type: ignore
+MATCHING_LSH_BANDS: int = env.int("MATCHING_LSH_BANDS", default=32)  # type: ignore
+MATCHING_LSH_ROWS: int = env.int("MATCHING_LSH_ROWS", default=2)  # type: ignore
+MATCHING_LSH_CANDIDATES: int = env.int("MATCHING_LSH_CANDIDATES", default=2000)  # type: ignore
+# Cache every user's ranked matches for this many seconds (0 disables). Entries
+# are dropped when the user's own interests change; the timeout bounds how long
+# other users' changes take to show up.
+MATCHING_CACHE_ALIAS: str = env("MATCHING_CACHE_ALIAS", default="default")  # type: ignore
+MATCHING_CACHE_TIMEOUT: int = env.int("MATCHING_CACHE_TIMEOUT", default=0)  # type: ignore
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
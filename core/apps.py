@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from . import authentication, catalog  # noqa: F401
+        from .metrics import database_pool_metrics, metrics_registry
+
+        metrics_registry.collectors.append(database_pool_metrics)
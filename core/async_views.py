@@ -0,0 +1,74 @@
+from typing import Any
+
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated
+
+from .authentication import aauthenticate_jwt
+from .catalog import catalog_cache
+from .models import Interest, InterestCategory
+from .renderers import FastJSONRenderer
+from .serializers import InterestCategorySerializer, InterestSerializer
+
+
+def json_response(data: Any, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    """Render ``data`` exactly like DRF's default JSON renderer does."""
+    return HttpResponse(
+        FastJSONRenderer().render(data), content_type="application/json", status=status_code
+    )
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of a DRF ``APIView`` for read-heavy endpoints:
+    JWT authentication and JSON rendering happen on the event loop, and the
+    only blocking work is the async ORM's own database calls.
+    """
+
+    requires_authentication = True
+    # Authenticate like StatelessJWTAuthentication, without loading the user
+    stateless_authentication = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if self.requires_authentication:
+                user = await aauthenticate_jwt(request, stateless=self.stateless_authentication)
+                if user is None:
+                    raise NotAuthenticated()
+                request.user = user
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            # Same payload and headers as DRF's default exception handler
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            response = json_response(data, exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response.headers["WWW-Authenticate"] = 'Bearer realm="api"'
+            return response
+
+
+class AsyncCatalogListView(AsyncAPIView):
+    requires_authentication = False
+    catalog_name: str
+    queryset: QuerySet
+    serializer_class: type
+
+    async def get(self, request):
+        return await catalog_cache.arespond(request, self.catalog_name, self.render_catalog)
+
+    async def render_catalog(self) -> bytes:
+        rows = [row async for row in self.queryset.all()]
+        return FastJSONRenderer().render(self.serializer_class(rows, many=True).data)
+
+
+class AsyncInterestCategoryListView(AsyncCatalogListView):
+    catalog_name = "interest-categories"
+    queryset = InterestCategory.objects.all()
+    serializer_class = InterestCategorySerializer
+
+
+class AsyncInterestListView(AsyncCatalogListView):
+    catalog_name = "interests"
+    queryset = Interest.objects.select_related("category")
+    serializer_class = InterestSerializer
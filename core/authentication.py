@@ -0,0 +1,201 @@
+import threading
+import time
+import uuid
+from typing import Any, Optional, Union
+
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+
+from .models import CustomUser
+
+# Claims copied into every token so that StatelessJWTAuthentication can
+# authenticate without loading the user
+USER_CLAIMS = ("public_id", "is_active", "is_staff")
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying ``USER_CLAIMS``; its access tokens inherit them."""
+
+    @classmethod
+    def for_user(cls, user: CustomUser) -> "UserClaimsRefreshToken":
+        token = super().for_user(user)
+        token["public_id"] = str(user.public_id)
+        token["is_active"] = user.is_active
+        token["is_staff"] = user.is_staff
+        return token
+
+
+class TokenDenylist:
+    """
+    In-process record of revoked access tokens, by ``jti``, and of users whose
+    tokens issued before a point in time must be refused. Entries are dropped
+    once the tokens they cover have expired.
+
+    Each process keeps its own list: revocations made elsewhere (another
+    worker, the admin on another host) are not seen until the token expires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: dict[str, float] = {}
+        self._users: dict[Any, float] = {}
+
+    def revoke_token(self, token: Token) -> None:
+        with self._lock:
+            self._tokens[token[api_settings.JTI_CLAIM]] = token["exp"]
+
+    def revoke_user(self, user_id: Any) -> None:
+        """
+        Refuse the tokens of ``user_id`` issued before the current second.
+        Tokens only record whole seconds, so ones issued earlier within this
+        second stay valid, while tokens issued right after, e.g. on logging in
+        again with a new password, are accepted.
+        """
+        with self._lock:
+            self._users[user_id] = int(time.time())
+
+    def is_revoked(self, token: Token) -> bool:
+        with self._lock:
+            self._prune()
+            if token.get(api_settings.JTI_CLAIM) in self._tokens:
+                return True
+            revoked_at = self._users.get(token.get(api_settings.USER_ID_CLAIM))
+            # Access tokens inherit the "iat" of the refresh token they came from
+            return revoked_at is not None and token.get("iat", 0) < revoked_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def _prune(self) -> None:
+        now = time.time()
+        for jti in [jti for jti, expires in self._tokens.items() if expires < now]:
+            del self._tokens[jti]
+        # Older revocations only cover tokens whose refresh token has expired
+        horizon = now - api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+        for user_id in [user_id for user_id, at in self._users.items() if at < horizon]:
+            del self._users[user_id]
+
+
+token_denylist = TokenDenylist()
+
+
+class LazyTokenUser(TokenUser):
+    """
+    Stateless user backed by the claims of a validated token. Attributes that
+    aren't claims are read from the ``CustomUser`` row, which is only loaded
+    the first time one is needed.
+    """
+
+    @cached_property
+    def public_id(self) -> uuid.UUID:
+        return uuid.UUID(self.token["public_id"])
+
+    @cached_property
+    def is_active(self) -> bool:  # type: ignore[override]
+        return self.token["is_active"]
+
+    @cached_property
+    def instance(self) -> CustomUser:
+        user = CustomUser.objects.filter(**{api_settings.USER_ID_FIELD: self.id}).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return user
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.instance, attr)
+
+
+# What request.user is on views authenticated by StatelessJWTAuthentication
+AuthenticatedUser = Union[CustomUser, LazyTokenUser]
+
+
+def carries_user_claims(token: Token) -> bool:
+    return all(claim in token for claim in USER_CLAIMS)
+
+
+def check_token_user(token: Token) -> LazyTokenUser:
+    """Turn a validated token with ``USER_CLAIMS`` into its user, if still allowed."""
+    if not token["is_active"]:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    if token_denylist.is_revoked(token):
+        raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+    return LazyTokenUser(token)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the signed ``USER_CLAIMS`` instead of
+    loading the user on every request. Meant for views that only need the
+    user's id; tokens issued without the claims fall back to the lookup.
+    """
+
+    def get_user(self, validated_token: Token) -> AuthenticatedUser:
+        if not carries_user_claims(validated_token):
+            return super().get_user(validated_token)
+        return check_token_user(validated_token)
+
+
+async def aauthenticate_jwt(
+    request: HttpRequest, stateless: bool = False
+) -> Optional[AuthenticatedUser]:
+    """
+    Async counterpart of ``JWTAuthentication.authenticate`` for plain Django
+    async views. Returns ``None`` when no token was sent and raises
+    ``InvalidToken``/``AuthenticationFailed`` like the DRF class does. With
+    ``stateless``, behaves like ``StatelessJWTAuthentication``.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = authentication.get_validated_token(raw_token)
+    if stateless and carries_user_claims(token):
+        return check_token_user(token)
+    user = await CustomUser.objects.filter(
+        **{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]}
+    ).afirst()
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
+
+
+@receiver(pre_save, sender=CustomUser)
+def revoke_on_credential_change(
+    sender, instance: CustomUser, raw=False, update_fields=None, **kwargs
+):
+    """Deny the tokens of users who get deactivated or change their password."""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not {"password", "is_active"} & set(update_fields):
+        return
+    previous = CustomUser.objects.filter(pk=instance.pk).values("is_active", "password").first()
+    if previous is None:
+        return
+    if previous["password"] != instance.password or (
+        previous["is_active"] and not instance.is_active
+    ):
+        token_denylist.revoke_user(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+@receiver(post_delete, sender=CustomUser)
+def revoke_on_delete(sender, instance: CustomUser, **kwargs):
+    token_denylist.revoke_user(getattr(instance, api_settings.USER_ID_FIELD))
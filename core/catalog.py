@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+
+from .models import Interest, InterestCategory
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    body: bytes
+    etag: str
+
+
+class CatalogCache:
+    """
+    Process-local cache of the pre-serialized interest catalog payloads.
+
+    Entries are dropped whenever an ``Interest`` or ``InterestCategory`` is
+    saved or deleted in this process. Other processes pick the change up once
+    their entry is older than ``max_age`` seconds.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[CatalogEntry, float]] = {}
+        self.version = 0
+
+    def lookup(self, name: str) -> tuple[Optional[CatalogEntry], int]:
+        """Return the fresh cached entry for ``name``, if any, and the current version."""
+        with self._lock:
+            cached = self._entries.get(name)
+            version = self.version
+        if cached is not None:
+            entry, built_at = cached
+            if self.max_age is None or time.monotonic() - built_at < self.max_age:
+                return entry, version
+        return None, version
+
+    def store(self, name: str, body: bytes, version: int) -> CatalogEntry:
+        """Cache a freshly rendered payload unless the catalog changed meanwhile."""
+        entry = CatalogEntry(
+            body=body,
+            # Derived from the content, so every process agrees on it
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        )
+        with self._lock:
+            if version == self.version:
+                self._entries[name] = (entry, time.monotonic())
+        return entry
+
+    def get(self, name: str, render: Callable[[], bytes]) -> CatalogEntry:
+        entry, version = self.lookup(name)
+        if entry is None:
+            entry = self.store(name, render(), version)
+        return entry
+
+    async def aget(self, name: str, arender: Callable[[], Awaitable[bytes]]) -> CatalogEntry:
+        entry, version = self.lookup(name)
+        if entry is None:
+            entry = self.store(name, await arender(), version)
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def respond(self, request: HttpRequest, name: str, render: Callable[[], bytes]):
+        """Return the cached payload, or a 304 when the client already has it."""
+        return self.conditional_response(request, self.get(name, render))
+
+    async def arespond(
+        self, request: HttpRequest, name: str, arender: Callable[[], Awaitable[bytes]]
+    ):
+        return self.conditional_response(request, await self.aget(name, arender))
+
+    def conditional_response(self, request: HttpRequest, entry: CatalogEntry):
+        response = HttpResponse(entry.body, content_type="application/json")
+        response.headers["ETag"] = entry.etag
+        # No Last-Modified: nothing records when the catalog changed, and the
+        # time an entry was rendered differs between processes and restarts
+        response.headers["Cache-Control"] = "public, no-cache"
+        return get_conditional_response(request, etag=entry.etag, response=response)
+
+
+catalog_cache = CatalogCache(max_age=settings.CATALOG_CACHE_MAX_AGE)
+
+
+@receiver(post_save, sender=Interest)
+@receiver(post_delete, sender=Interest)
+@receiver(post_save, sender=InterestCategory)
+@receiver(post_delete, sender=InterestCategory)
+def invalidate_catalog(sender, **kwargs):
+    catalog_cache.invalidate()
+    # Again once committed, in case a concurrent request re-rendered old rows
+    transaction.on_commit(catalog_cache.invalidate)
@@ -0,0 +1,269 @@
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from django.db import connection, transaction
+
+from .models import CustomUser, Interest, UserInterest, UserProfile
+from .signals import user_interests_changed
+
+USER_INTERESTS = UserInterest._meta.db_table
+# Session-scoped tables holding the whole file until the merge
+STAGED_USERS = "import_staged_user"
+STAGED_INTERESTS = "import_staged_user_interest"
+
+# Both statements cover the staged users of one id window. Staged users keep
+# exactly the staged interests: the others are deleted, the missing inserted.
+DELETE_SQL = f"""
+DELETE FROM {USER_INTERESTS}
+WHERE user_id IN (
+        SELECT user_id FROM {STAGED_USERS} WHERE user_id >= %s AND user_id <= %s
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM {STAGED_INTERESTS} staged
+        WHERE staged.user_id = {USER_INTERESTS}.user_id
+            AND staged.interest_id = {USER_INTERESTS}.interest_id
+    )
+RETURNING user_id, interest_id
+"""
+
+INSERT_SQL = f"""
+INSERT INTO {USER_INTERESTS} (user_id, interest_id)
+SELECT DISTINCT user_id, interest_id FROM {STAGED_INTERESTS}
+WHERE user_id >= %s AND user_id <= %s
+ON CONFLICT (user_id, interest_id) DO NOTHING
+RETURNING user_id, interest_id
+"""
+
+
+class ImportRecord(NamedTuple):
+    email: str
+    # (category name, interest name) pairs
+    interests: list[tuple[str, str]]
+    # Only used for users the import creates
+    birth_date: Optional[date] = None
+    bio: str = ""
+
+
+def _record(line: int, email, interests, birth_date, bio) -> ImportRecord:
+    for field, value in (("email", email), ("birth_date", birth_date), ("bio", bio)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"Line {line}: {field} must be a string")
+    if not all(isinstance(name, str) for pair in interests for name in pair):
+        raise ValueError(f"Line {line}: category and interest must be strings")
+    if not email or not email.strip():
+        raise ValueError(f"Line {line}: missing email")
+    try:
+        parsed_birth_date = date.fromisoformat(birth_date) if birth_date else None
+    except ValueError:
+        raise ValueError(f"Line {line}: invalid birth_date {birth_date!r}")
+    return ImportRecord(
+        CustomUser.objects.normalize_email(email.strip()), interests, parsed_birth_date, bio or ""
+    )
+
+
+def read_ndjson(lines: TextIO) -> Iterator[ImportRecord]:
+    """
+    One user per line: ``{"email": ..., "interests": [{"category": ...,
+    "interest": ...}], "birth_date": "YYYY-MM-DD", "bio": ...}``.
+    """
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+            interests = [(item["category"], item["interest"]) for item in data.get("interests", [])]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise ValueError(f"Line {line}: expected a JSON object with an interests list")
+        yield _record(line, data.get("email"), interests, data.get("birth_date"), data.get("bio"))
+
+
+def read_csv(lines: TextIO) -> Iterator[ImportRecord]:
+    """
+    One interest per row, with the columns ``email``, ``category``,
+    ``interest`` and optionally ``birth_date`` and ``bio``. A user's rows
+    needn't be adjacent; a row with empty interest columns imports the user
+    without interests.
+    """
+    reader = csv.DictReader(lines)
+    missing = {"email", "category", "interest"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+    for row in reader:
+        category, interest = row["category"], row["interest"]
+        yield _record(
+            reader.line_num,
+            row["email"],
+            [(category, interest)] if category or interest else [],
+            row.get("birth_date"),
+            row.get("bio"),
+        )
+
+
+@dataclass
+class ImportStats:
+    records: int = 0
+    users_created: int = 0
+    users_merged: int = 0
+    interests_added: int = 0
+    interests_removed: int = 0
+    # Interest names missing from the catalog, which are skipped
+    unknown_interests: int = 0
+
+
+class InterestImport:
+    """
+    Make the interests of every user in a stream of records exactly the ones
+    listed, creating missing users (without a usable password) and profiles.
+
+    Records are read ``chunk_size`` at a time: users are created and the
+    resolved ``(user, interest)`` rows are staged in temporary tables (with
+    ``COPY`` on PostgreSQL), so memory doesn't depend on the input size. Once
+    the whole input is staged, the difference is merged ``merge_size`` users
+    per transaction and ``user_interests_changed`` is sent for every user.
+
+    An error while staging, such as a malformed record, aborts the import
+    before the merge, so nobody's interests change. The users created for
+    the chunks staged before it are kept, with their profiles: importing the
+    corrected input again merges into them.
+    """
+
+    def __init__(self, chunk_size: int = 5000, merge_size: int = 1000):
+        self.chunk_size = chunk_size
+        self.merge_size = merge_size
+        self.stats = ImportStats()
+        self.catalog = {
+            (category, name): interest_id
+            for interest_id, name, category in Interest.objects.values_list(
+                "id", "name", "category__name"
+            )
+        }
+
+    def run(self, records: Iterable[ImportRecord]) -> Iterator[tuple[str, ImportStats]]:
+        """Yield the phase ("stage" or "merge") and the stats after every chunk."""
+        self._create_staging_tables()
+        try:
+            records = iter(records)
+            while chunk := list(islice(records, self.chunk_size)):
+                self._stage(chunk)
+                yield "stage", self.stats
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE INDEX {STAGED_USERS}_idx ON {STAGED_USERS} (user_id)")
+                cursor.execute(
+                    f"CREATE INDEX {STAGED_INTERESTS}_idx ON {STAGED_INTERESTS} (user_id, interest_id)"
+                )
+            for _ in self._merge():
+                yield "merge", self.stats
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {STAGED_USERS}")
+                cursor.execute(f"DROP TABLE IF EXISTS {STAGED_INTERESTS}")
+
+    def _create_staging_tables(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGED_USERS}")
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGED_INTERESTS}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {STAGED_USERS} (user_id bigint NOT NULL)")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {STAGED_INTERESTS} "
+                "(user_id bigint NOT NULL, interest_id bigint NOT NULL)"
+            )
+
+    def _stage(self, chunk: list[ImportRecord]) -> None:
+        self.stats.records += len(chunk)
+        first_records = {}
+        for record in chunk:
+            first_records.setdefault(record.email, record)
+        with transaction.atomic():
+            user_ids = self._ensure_users(first_records)
+            interest_rows = set()
+            for record in chunk:
+                for category, name in record.interests:
+                    interest_id = self.catalog.get((category, name))
+                    if interest_id is None:
+                        self.stats.unknown_interests += 1
+                    else:
+                        interest_rows.add((user_ids[record.email], interest_id))
+            with connection.cursor() as cursor:
+                # A user's records may span chunks; the merge reads distinct users
+                self._copy(
+                    cursor,
+                    STAGED_USERS,
+                    ("user_id",),
+                    [(user_id,) for user_id in user_ids.values()],
+                )
+                self._copy(cursor, STAGED_INTERESTS, ("user_id", "interest_id"), interest_rows)
+
+    def _ensure_users(self, records: dict[str, ImportRecord]) -> dict[str, int]:
+        """Ids of the users of ``records`` by email, creating the missing ones."""
+        user_ids = dict(CustomUser.objects.filter(email__in=records).values_list("email", "id"))
+        new_users = []
+        for email in records:
+            if email not in user_ids:
+                user = CustomUser(email=email)
+                user.set_unusable_password()
+                new_users.append(user)
+        CustomUser.objects.bulk_create(new_users)
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user_id=user.id,
+                    birth_date=records[user.email].birth_date,
+                    bio=records[user.email].bio,
+                )
+                for user in new_users
+            ]
+        )
+        self.stats.users_created += len(new_users)
+        user_ids.update((user.email, user.id) for user in new_users)
+        return user_ids
+
+    @staticmethod
+    def _copy(cursor, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> None:
+        """Load rows with COPY on PostgreSQL, a plain executemany elsewhere."""
+        if connection.vendor == "postgresql":
+            with cursor.cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            placeholders = ", ".join(["%s"] * len(columns))
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", list(rows)
+            )
+
+    def _merge(self) -> Iterator[None]:
+        last = -1
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT DISTINCT user_id FROM {STAGED_USERS} WHERE user_id > %s "
+                    "ORDER BY user_id LIMIT %s",
+                    [last, self.merge_size],
+                )
+                window = [user_id for user_id, in cursor.fetchall()]
+            if not window:
+                return
+            first, last = window[0], window[-1]
+            changes: dict[int, tuple[set[int], set[int]]] = {
+                user_id: (set(), set()) for user_id in window
+            }
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(DELETE_SQL, [first, last])
+                    for user_id, interest_id in cursor.fetchall():
+                        changes[user_id][1].add(interest_id)
+                    cursor.execute(INSERT_SQL, [first, last])
+                    for user_id, interest_id in cursor.fetchall():
+                        changes[user_id][0].add(interest_id)
+                for user_id, (added, removed) in changes.items():
+                    self.stats.interests_added += len(added)
+                    self.stats.interests_removed += len(removed)
+                    if added or removed:
+                        user_interests_changed.send(
+                            sender=UserInterest, user_id=user_id, added=added, removed=removed
+                        )
+            self.stats.users_merged += len(window)
+            yield
@@ -0,0 +1,128 @@
+from typing import Iterable, NamedTuple
+
+from django.db import connection
+
+from .models import Interest, InterestCategory, UserInterest
+from .signals import user_interests_changed
+
+USER_INTERESTS = UserInterest._meta.db_table
+INTERESTS = Interest._meta.db_table
+CATEGORIES = InterestCategory._meta.db_table
+
+# Validates the requested ids, deletes and inserts the difference and returns
+# the final rows with their names, in one statement. Every CTE sees the rows
+# as they were before the statement, so "kept" is the requested part of them.
+# Nothing is written when an id doesn't exist.
+REPLACE_SQL = f"""
+WITH requested AS (
+    SELECT DISTINCT requested_id FROM unnest(%(interest_ids)s::bigint[]) AS requested_id
+),
+invalid AS (
+    SELECT requested_id FROM requested
+    WHERE NOT EXISTS (SELECT 1 FROM {INTERESTS} WHERE id = requested_id)
+),
+removed AS (
+    DELETE FROM {USER_INTERESTS}
+    WHERE user_id = %(user_id)s
+        AND interest_id NOT IN (SELECT requested_id FROM requested)
+        AND NOT EXISTS (SELECT 1 FROM invalid)
+    RETURNING interest_id
+),
+added AS (
+    INSERT INTO {USER_INTERESTS} (user_id, interest_id)
+    SELECT %(user_id)s, requested_id FROM requested
+    WHERE NOT EXISTS (SELECT 1 FROM invalid)
+    ON CONFLICT (user_id, interest_id) DO NOTHING
+    RETURNING id, interest_id
+),
+final AS (
+    SELECT 'kept' AS change, id, interest_id FROM {USER_INTERESTS}
+    WHERE user_id = %(user_id)s AND interest_id IN (SELECT requested_id FROM requested)
+    UNION ALL
+    SELECT 'added', id, interest_id FROM added
+)
+SELECT 'invalid', NULL::bigint, requested_id, NULL::varchar, NULL::bigint, NULL::varchar
+FROM invalid
+UNION ALL
+SELECT 'removed', NULL, interest_id, NULL, NULL, NULL FROM removed
+UNION ALL
+SELECT final.change, final.id, final.interest_id, interest.name, category.id, category.name
+FROM final
+JOIN {INTERESTS} interest ON interest.id = final.interest_id
+JOIN {CATEGORIES} category ON category.id = interest.category_id
+ORDER BY 2
+"""
+
+
+class InterestsUpdate(NamedTuple):
+    # The user's rows after the update, ordered by id, with interest and category loaded
+    interests: list[UserInterest]
+    added: set[int]
+    removed: set[int]
+    # Requested ids without an Interest; nothing is changed when there are any
+    invalid: set[int]
+
+
+def replace_user_interests(user_id: int, interest_ids: Iterable[int]) -> InterestsUpdate:
+    """
+    Make ``interest_ids`` the interests of ``user_id``, deleting and inserting
+    only the difference, and send ``user_interests_changed`` for the changes
+    that the model signals didn't report. Meant to run in a transaction.
+    """
+    interest_ids = set(interest_ids)
+    if connection.vendor == "postgresql":
+        update = _replace_in_one_statement(user_id, interest_ids)
+        announced_removed = update.removed
+    else:
+        update = _replace_with_queries(user_id, interest_ids)
+        # QuerySet.delete() sent post_delete for every removed row
+        announced_removed = set()
+    if not update.invalid:
+        # Inserting doesn't send post_save, so the additions are always announced
+        user_interests_changed.send(
+            sender=UserInterest, user_id=user_id, added=update.added, removed=announced_removed
+        )
+    return update
+
+
+def _replace_in_one_statement(user_id: int, interest_ids: set[int]) -> InterestsUpdate:
+    update = InterestsUpdate([], set(), set(), set())
+    with connection.cursor() as cursor:
+        cursor.execute(REPLACE_SQL, {"user_id": user_id, "interest_ids": sorted(interest_ids)})
+        for change, row_id, interest_id, name, category_id, category_name in cursor.fetchall():
+            if change == "invalid":
+                update.invalid.add(interest_id)
+            elif change == "removed":
+                update.removed.add(interest_id)
+            else:
+                if change == "added":
+                    update.added.add(interest_id)
+                category = InterestCategory(id=category_id, name=category_name)
+                interest = Interest(id=interest_id, name=name, category=category)
+                update.interests.append(UserInterest(id=row_id, user_id=user_id, interest=interest))
+    return update
+
+
+def _replace_with_queries(user_id: int, interest_ids: set[int]) -> InterestsUpdate:
+    """Portable version for databases without writable CTEs."""
+    invalid = interest_ids - set(
+        Interest.objects.filter(id__in=interest_ids).values_list("id", flat=True)
+    )
+    if invalid:
+        return InterestsUpdate([], set(), set(), invalid)
+
+    existing = set(
+        UserInterest.objects.filter(user_id=user_id).values_list("interest_id", flat=True)
+    )
+    removed = existing - interest_ids
+    added = interest_ids - existing
+    UserInterest.objects.filter(user_id=user_id, interest_id__in=removed).delete()
+    UserInterest.objects.bulk_create(
+        UserInterest(user_id=user_id, interest_id=interest_id) for interest_id in added
+    )
+    interests = list(
+        UserInterest.objects.filter(user_id=user_id)
+        .select_related("interest__category")
+        .order_by("id")
+    )
+    return InterestsUpdate(interests, added, removed, set())
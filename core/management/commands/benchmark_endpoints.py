@@ -0,0 +1,217 @@
+import json
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.authentication import UserClaimsRefreshToken
+from core.management.commands.seed_matching_data import EMAIL_DOMAIN
+from core.models import CustomUser, Interest, UserInterest
+
+# Plan nodes that read table rows; their actual row counts add up to "rows scanned"
+SCAN_NODES = {"Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main endpoints against seeded datasets of several sizes and write "
+        "p50/p95 latency, SQL query count and rows scanned to a JSON file. Meant for a "
+        "local PostgreSQL database; compare two runs with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10000,100000,1000000",
+            help="Comma-separated numbers of seeded users to benchmark at.",
+        )
+        parser.add_argument("--iterations", type=int, default=50, help="Requests per endpoint.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--reuse",
+            action="store_true",
+            help="Keep the seeded data if it already has the requested size.",
+        )
+        parser.add_argument("--output", default="benchmark-results.json")
+        parser.add_argument("--compare", help="Earlier results file to print deltas against.")
+        parser.add_argument(
+            "--allow-non-postgres",
+            action="store_true",
+            help="Run on other databases too (no rows-scanned figures; for smoke tests).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql" and not options["allow_non_postgres"]:
+            raise CommandError("Benchmarks must run against PostgreSQL.")
+        rng = random.Random(options["seed"])
+        results = []
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            for size in [int(size) for size in options["sizes"].split(",")]:
+                self.prepare_dataset(size, options)
+                for endpoint, request in self.endpoints(rng):
+                    result = self.measure(request, options["iterations"])
+                    results.append({"size": size, "endpoint": endpoint, **result})
+                    self.print_result(results[-1])
+
+        report = {
+            "commit": self.current_commit(),
+            "database": connection.vendor,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "settings": {
+                name: getattr(settings, name)
+                for name in dir(settings)
+                if name.startswith("MATCHING_") or name == "CATALOG_CACHE_MAX_AGE"
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline:
+                self.print_comparison(json.load(baseline), report)
+
+    def prepare_dataset(self, size: int, options) -> None:
+        seeded = CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").count()
+        if options["reuse"] and seeded == size:
+            return
+        self.stdout.write(f"Seeding {size} users...")
+        call_command(
+            "seed_matching_data", users=size, seed=options["seed"], clear=True, stdout=self.stdout
+        )
+
+    def endpoints(self, rng: random.Random):
+        """Yield ``(name, request)`` pairs; each call of ``request`` issues one request."""
+        user_ids = list(
+            CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+            .order_by("?")
+            .values_list("id", flat=True)[:100]
+        )
+        users = list(CustomUser.objects.filter(id__in=user_ids))
+        headers = {
+            user.id: {
+                "Authorization": f"Bearer {UserClaimsRefreshToken.for_user(user).access_token}"
+            }
+            for user in users
+        }
+        interest_ids = list(Interest.objects.values_list("id", flat=True))
+        client = Client()
+
+        def as_someone(send: Callable[[CustomUser, dict], Any]) -> Callable[[], Any]:
+            return lambda: send(user := rng.choice(users), headers[user.id])
+
+        def bulk_update(user, auth):
+            # Swap one interest, keeping the dataset's shape stable across iterations
+            current = list(
+                UserInterest.objects.filter(user=user).values_list("interest_id", flat=True)
+            )
+            if current:
+                current.remove(rng.choice(current))
+            current.append(rng.choice(interest_ids))
+            return client.post(
+                reverse("user_interests_bulk_update"),
+                {"interest_ids": sorted(set(current))},
+                content_type="application/json",
+                headers=auth,
+            )
+
+        yield "common-interests", as_someone(
+            lambda user, auth: client.get(reverse("common-interests"), headers=auth)
+        )
+        yield "public-profile", as_someone(
+            lambda user, auth: client.get(
+                reverse("public-profile", args=[rng.choice(users).public_id]), headers=auth
+            )
+        )
+        yield "user-interests-bulk-update", as_someone(bulk_update)
+        yield "interest-list", lambda: client.get(reverse("interest_list"))
+        yield "interest-category-list", lambda: client.get(reverse("interest-category-list"))
+
+    def measure(self, request: Callable[[], Any], iterations: int) -> dict[str, Any]:
+        # One warm-up request, which also provides the queries to explain. Requests
+        # reset the query log when they start, so it must be empty going in.
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = request()
+        # captured_queries slices the live log, which the timed requests below reset
+        queries = list(captured.captured_queries)
+        if response.status_code >= 400:
+            raise CommandError(f"Request failed with {response.status_code}: {response.content!r}")
+
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            request()
+            latencies.append((time.perf_counter() - started) * 1000)
+        quantiles = (
+            statistics.quantiles(latencies, n=20, method="inclusive")
+            if len(latencies) > 1
+            else latencies * 19
+        )
+        return {
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p95_ms": round(quantiles[18], 3),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+            "queries": len(queries),
+            "rows_scanned": self.rows_scanned(queries),
+        }
+
+    def rows_scanned(self, queries: list[dict]) -> Optional[int]:
+        if connection.vendor != "postgresql":
+            return None
+        total = 0
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query["sql"].lstrip().upper().startswith("SELECT"):
+                    continue
+                cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query['sql']}")
+                total += self.scanned_in_plan(cursor.fetchone()[0][0]["Plan"])
+        return total
+
+    def scanned_in_plan(self, plan: dict) -> int:
+        own = plan["Actual Rows"] * plan["Actual Loops"] if plan["Node Type"] in SCAN_NODES else 0
+        return own + sum(self.scanned_in_plan(child) for child in plan.get("Plans", ()))
+
+    def current_commit(self) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_result(self, result: dict[str, Any]) -> None:
+        self.stdout.write(
+            f"{result['size']:>9} {result['endpoint']:<28} p50 {result['p50_ms']:>8.2f} ms  "
+            f"p95 {result['p95_ms']:>8.2f} ms  {result['queries']:>3} queries  "
+            f"{result['rows_scanned'] if result['rows_scanned'] is not None else '-'} rows"
+        )
+
+    def print_comparison(self, baseline: dict, report: dict) -> None:
+        before = {(row["size"], row["endpoint"]): row for row in baseline["results"]}
+        self.stdout.write(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+        for row in report["results"]:
+            old = before.get((row["size"], row["endpoint"]))
+            if old is None:
+                continue
+            change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+            self.stdout.write(
+                f"{row['size']:>9} {row['endpoint']:<28} p95 {old['p95_ms']:.2f} -> "
+                f"{row['p95_ms']:.2f} ms ({change:+.1f}%), "
+                f"queries {old['queries']} -> {row['queries']}"
+            )
@@ -0,0 +1,72 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.interest_import import InterestImport, read_csv, read_ndjson
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users and their interests from a CSV or NDJSON file (optionally "
+        "gzipped). Missing users are created with a profile and no usable password; "
+        "every user in the file ends up with exactly the listed interests. Interests "
+        "are matched by category and interest name; unknown ones are skipped. A "
+        "malformed record aborts the import before any interest changes, but keeps "
+        "the users already created; rerun it with the corrected file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Input format; guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000, help="Records staged per transaction."
+        )
+        parser.add_argument(
+            "--merge-size", type=int, default=1000, help="Users merged per transaction."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        name = path.removesuffix(".gz")
+        input_format = options["format"] or next(
+            (extension for extension in READERS if name.endswith(f".{extension}")), None
+        )
+        if input_format is None:
+            raise CommandError("Can't guess the input format, pass --format.")
+
+        opener = gzip.open if path.endswith(".gz") else open
+        importer = InterestImport(options["chunk_size"], options["merge_size"])
+        started = time.monotonic()
+        try:
+            with opener(path, "rt", encoding="utf-8", newline="") as lines:
+                for phase, stats in importer.run(READERS[input_format](lines)):
+                    elapsed = time.monotonic() - started
+                    if phase == "stage":
+                        self.stdout.write(
+                            f"staged {stats.records} records ({stats.records / elapsed:.0f}/s), "
+                            f"{stats.users_created} users created"
+                        )
+                    else:
+                        self.stdout.write(
+                            f"merged {stats.users_merged} users, "
+                            f"+{stats.interests_added}/-{stats.interests_removed} interests"
+                        )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        stats = importer.stats
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {stats.records} records for {stats.users_merged} users in "
+                f"{time.monotonic() - started:.1f}s: {stats.users_created} users created, "
+                f"{stats.interests_added} interests added, {stats.interests_removed} removed, "
+                f"{stats.unknown_interests} unknown interests skipped"
+            )
+        )
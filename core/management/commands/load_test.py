@@ -0,0 +1,92 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch, reverse
+
+from core.authentication import UserClaimsRefreshToken
+from core.management.commands.seed_matching_data import EMAIL_DOMAIN
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent authenticated GET requests to an endpoint of a running server "
+        "(e.g. gunicorn against the seeded database) and report throughput and latency "
+        "percentiles. Tokens are minted for seeded users, so the server must share this "
+        "SECRET_KEY and database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--url-name", default="common-interests")
+        parser.add_argument("--requests", type=int, default=1000, help="Requests in total.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Parallel clients.")
+        parser.add_argument(
+            "--users", type=int, default=100, help="Seeded users the requests are spread over."
+        )
+        parser.add_argument("--output", help="JSON file to write the results to.")
+
+    def handle(self, *args, **options):
+        try:
+            url = urljoin(options["base_url"], reverse(options["url_name"]))
+        except NoReverseMatch:
+            raise CommandError(f"No URL named {options['url_name']!r} without arguments.")
+        users = list(
+            CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").order_by("?")[
+                : options["users"]
+            ]
+        )
+        if not users:
+            raise CommandError("No seeded users; run seed_matching_data first.")
+        headers = [
+            {"Authorization": f"Bearer {UserClaimsRefreshToken.for_user(user).access_token}"}
+            for user in users
+        ]
+
+        # One keep-alive session per client thread
+        local = threading.local()
+
+        def send(number: int) -> tuple[float, int]:
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            started = time.perf_counter()
+            try:
+                status = local.session.get(url, headers=headers[number % len(headers)]).status_code
+            except requests.RequestException:
+                status = 0
+            return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            results = list(executor.map(send, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, status in results if status == 200)
+        if len(latencies) < 2:
+            raise CommandError("Fewer than two requests succeeded.")
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        report = {
+            "url": url,
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "errors": len(results) - len(latencies),
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": cuts[49],
+            "p95_ms": cuts[94],
+            "p99_ms": cuts[98],
+            "max_ms": latencies[-1],
+        }
+        self.stdout.write(
+            f"{report['throughput']:.1f} req/s, p50 {report['p50_ms']:.1f} ms, "
+            f"p95 {report['p95_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms, "
+            f"max {report['max_ms']:.1f} ms, {report['errors']} errors"
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,197 @@
+import io
+import time
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import (
+    CustomUser,
+    Interest,
+    InterestCategory,
+    UserInterest,
+    UserInterestCategoryImportance,
+    UserProfile,
+)
+
+EMAIL_DOMAIN = "seed.bestman.test"
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users, profiles, interests and importances for sizing "
+        "matching queries. Output is reproducible for a given --seed; interest "
+        "popularity follows a Zipf distribution. Rows are written without signals, "
+        "so rebuild the derived matching tables afterwards if they are enabled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--interests-per-category", type=int, default=25)
+        parser.add_argument(
+            "--interests-per-user",
+            type=int,
+            default=12,
+            help="Mean number of interests per user (Poisson distributed, at least 1).",
+        )
+        parser.add_argument(
+            "--zipf-exponent",
+            type=float,
+            default=1.1,
+            help="Skew of interest popularity: weight of the k-th interest is 1 / k**exponent.",
+        )
+        parser.add_argument(
+            "--importance-rate",
+            type=float,
+            default=0.5,
+            help="Probability that a user rates a given category.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument(
+            "--password",
+            default="seedpassword",
+            help="Password of every generated user; hashed once and reused.",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help=f"Delete previously seeded users (emails @{EMAIL_DOMAIN}) first.",
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        started = time.monotonic()
+
+        if options["clear"]:
+            self.clear()
+
+        category_ids, interest_ids, interest_categories = self.create_catalog(options)
+        # Popularity rank is independent of catalog order
+        popularity = 1.0 / np.arange(1, len(interest_ids) + 1) ** options["zipf_exponent"]
+        popularity = rng.permutation(popularity / popularity.sum())
+
+        password = make_password(options["password"])
+        created = 0
+        existing = CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").count()
+        while created < options["users"]:
+            size = min(options["batch_size"], options["users"] - created)
+            with transaction.atomic():
+                user_ids = self.create_users(rng, existing + created, size, password)
+                self.create_user_interests(
+                    rng, user_ids, interest_ids, popularity, options["interests_per_user"]
+                )
+                self.create_importances(rng, user_ids, category_ids, options["importance_rate"])
+            created += size
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{created} users ({created / elapsed:.0f} users/s)")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {created} users in {time.monotonic() - started:.1f}s")
+        )
+
+    def clear(self) -> None:
+        seeded = CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+        with transaction.atomic():
+            # The per-user rows are far too many to go through the deletion
+            # collector and its per-row signals; delete them in one statement each
+            for related in (UserInterest, UserInterestCategoryImportance):
+                related.objects.filter(user__in=seeded)._raw_delete(connection.alias)
+            deleted, _ = seeded.delete()
+        self.stdout.write(f"Deleted {deleted} previously seeded rows")
+
+    def create_catalog(self, options):
+        categories = [
+            InterestCategory(name=f"Seed category {number}")
+            for number in range(options["categories"])
+        ]
+        InterestCategory.objects.bulk_create(categories, ignore_conflicts=True)
+        category_ids = dict(
+            InterestCategory.objects.filter(
+                name__in=[category.name for category in categories]
+            ).values_list("name", "id")
+        )
+        interests = [
+            Interest(name=f"Seed interest {number}.{item}", category_id=category_id)
+            for number, category_id in enumerate(
+                category_ids[category.name] for category in categories
+            )
+            for item in range(options["interests_per_category"])
+        ]
+        Interest.objects.bulk_create(interests, ignore_conflicts=True)
+        rows = list(
+            Interest.objects.filter(category_id__in=category_ids.values())
+            .order_by("id")
+            .values_list("id", "category_id")
+        )
+        return (
+            np.array(sorted(category_ids.values()), dtype=np.int64),
+            np.array([interest_id for interest_id, _ in rows], dtype=np.int64),
+            np.array([category_id for _, category_id in rows], dtype=np.int64),
+        )
+
+    def create_users(self, rng, offset: int, size: int, password: str) -> np.ndarray:
+        users = [
+            CustomUser(
+                email=f"user{offset + number}@{EMAIL_DOMAIN}",
+                password=password,
+                public_id=uuid.UUID(bytes=rng.bytes(16), version=4),
+            )
+            for number in range(size)
+        ]
+        CustomUser.objects.bulk_create(users)
+        # Ages between 18 and 70
+        ages_in_days = rng.integers(18 * 365, 70 * 365, size=size)
+        today = date.today()
+        UserProfile.objects.bulk_create(
+            UserProfile(user_id=user.id, birth_date=today - timedelta(days=int(days)))
+            for user, days in zip(users, ages_in_days)
+        )
+        return np.array([user.id for user in users], dtype=np.int64)
+
+    def create_user_interests(self, rng, user_ids, interest_ids, popularity, mean: int) -> None:
+        counts = np.clip(rng.poisson(mean, size=len(user_ids)), 1, len(interest_ids))
+        rows = np.column_stack(
+            [
+                np.repeat(user_ids, counts),
+                np.concatenate(
+                    [
+                        rng.choice(interest_ids, size=count, replace=False, p=popularity)
+                        for count in counts
+                    ]
+                ),
+            ]
+        )
+        self.insert(UserInterest, ("user_id", "interest_id"), rows)
+
+    def create_importances(self, rng, user_ids, category_ids, rate: float) -> None:
+        rated = rng.random((len(user_ids), len(category_ids))) < rate
+        users, categories = np.nonzero(rated)
+        rows = np.column_stack(
+            [
+                user_ids[users],
+                category_ids[categories],
+                rng.integers(1, 6, size=len(users)),
+            ]
+        )
+        self.insert(UserInterestCategoryImportance, ("user_id", "category_id", "importance"), rows)
+
+    def insert(self, model, columns: tuple[str, ...], rows: np.ndarray) -> None:
+        """Load integer rows with COPY on PostgreSQL, a plain executemany elsewhere."""
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                buffer = io.StringIO()
+                np.savetxt(buffer, rows, fmt="%d", delimiter="\t")
+                with cursor.cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                    copy.write(buffer.getvalue())
+            else:
+                placeholders = ", ".join(["%s"] * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    rows.tolist(),
+                )
@@ -0,0 +1,295 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+# Upper bounds of the histogram buckets, Prometheus' defaults for seconds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Longest SQL text put in a Server-Timing description
+SLOWEST_SQL_LENGTH = 200
+
+
+class RequestMetrics:
+    """Database and serializer time spent by one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ""
+        self.serializer_time = 0.0
+        self.total_time = 0.0
+        self._serializing = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        """``execute_wrapper`` hook timing every statement run for the request."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if duration >= self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+
+    @contextmanager
+    def serializing(self):
+        # Serializers may evaluate other serializers' data; count the outermost only
+        self._serializing += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._serializing -= 1
+            if not self._serializing:
+                self.serializer_time += time.perf_counter() - started
+
+    def server_timing(self) -> str:
+        """
+        Render a ``Server-Timing`` header. The slowest statement is described by
+        its SQL with placeholders, so parameter values never leave the server.
+        """
+        # Keep the description a valid quoted-string on a single latin-1 line
+        slowest = " ".join(self.slowest_sql.split())[:SLOWEST_SQL_LENGTH]
+        slowest = slowest.encode("ascii", "replace").decode().replace("\\", "/").replace('"', "'")
+        entries = [
+            f'db;dur={self.db_time * 1000:.3f};desc="{self.queries} queries"',
+            f'db-slowest;dur={self.slowest_time * 1000:.3f};desc="{slowest}"',
+            f"serializer;dur={self.serializer_time * 1000:.3f}",
+            f"total;dur={self.total_time * 1000:.3f}",
+        ]
+        return ", ".join(entries)
+
+
+# Metrics of the request being handled on this thread or task, if it is measured
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram with one series per ``view`` label."""
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def observe(self, view: str, value: float) -> None:
+        counts = self._series.setdefault(view, [0] * (len(self.buckets) + 1))
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[view] = self._sums.get(view, 0.0) + value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for view in sorted(self._series):
+            label = f'view="{view}"'
+            cumulative = 0
+            bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, self._series[view]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {self._sums[view]!r}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Per-URL-name histograms of the measured requests, kept in process memory:
+    every worker reports its own requests. Other apps can append callables
+    returning extra exposition lines to ``collectors``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.collectors: list[Callable[[], list[str]]] = []
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.duration = Histogram(
+                "bestman_request_duration_seconds", "Time spent handling requests.", SECONDS_BUCKETS
+            )
+            self.db_time = Histogram(
+                "bestman_request_db_seconds", "Time spent running SQL per request.", SECONDS_BUCKETS
+            )
+            self.queries = Histogram(
+                "bestman_request_queries", "SQL statements run per request.", QUERY_BUCKETS
+            )
+            self.serializer_time = Histogram(
+                "bestman_request_serializer_seconds",
+                "Time spent in serializers per request.",
+                SECONDS_BUCKETS,
+            )
+
+    def observe(self, view: str, metrics: RequestMetrics) -> None:
+        with self._lock:
+            self.duration.observe(view, metrics.total_time)
+            self.db_time.observe(view, metrics.db_time)
+            self.queries.observe(view, metrics.queries)
+            self.serializer_time.observe(view, metrics.serializer_time)
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = (self.duration, self.db_time, self.queries, self.serializer_time)
+            lines = [line for histogram in histograms for line in histogram.render()]
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+# Prometheus metric, type and psycopg_pool statistic of every exported pool figure
+POOL_METRICS = (
+    ("bestman_db_pool_connections", "gauge", "pool_size"),
+    ("bestman_db_pool_available_connections", "gauge", "pool_available"),
+    ("bestman_db_pool_waiting_requests", "gauge", "requests_waiting"),
+    ("bestman_db_pool_requests_total", "counter", "requests_num"),
+    ("bestman_db_pool_queued_requests_total", "counter", "requests_queued"),
+    ("bestman_db_pool_wait_seconds_total", "counter", "requests_wait_ms"),
+    ("bestman_db_pool_errors_total", "counter", "requests_errors"),
+)
+
+
+def database_pool_metrics() -> list[str]:
+    """
+    Connection pool statistics of this process, per database alias, for the
+    metrics endpoint. Queued requests are the ones that found no free
+    connection and waited for one; errors are the waits that timed out.
+    """
+    stats = {}
+    for connection in connections.all(initialized_only=True):
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            stats[connection.alias] = pool.get_stats()
+    lines = []
+    for metric, kind, key in POOL_METRICS:
+        lines.append(f"# TYPE {metric} {kind}")
+        for alias, values in sorted(stats.items()):
+            value = values.get(key, 0)
+            if key.endswith("_ms"):
+                value /= 1000
+            lines.append(f'{metric}{{alias="{alias}"}} {value}')
+    return lines if stats else []
+
+
+# The data properties replaced by install_timing(), to restore them
+_untimed_data: dict[type, property] = {}
+
+
+def record_query(execute, sql, params, many, context):
+    """``execute_wrapper`` timing the statements of measured requests."""
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def add_query_timing(connection, **kwargs) -> None:
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_timing() -> None:
+    """
+    Time every statement and every evaluation of ``serializer.data`` made by
+    a measured request. Statements are timed on each connection as it is
+    opened: the async ORM queries through its own threads' connections.
+    """
+    connection_created.connect(add_query_timing, dispatch_uid="request-metrics")
+    for connection in connections.all(initialized_only=True):
+        add_query_timing(connection)
+
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if serializer_class in _untimed_data:
+            continue
+
+        def data(self, original=serializer_class.data.fget):
+            metrics = current_request.get()
+            if metrics is None:
+                return original(self)
+            with metrics.serializing():
+                return original(self)
+
+        _untimed_data[serializer_class] = serializer_class.data
+        serializer_class.data = property(data)  # type: ignore[method-assign]
+
+
+def uninstall_timing() -> None:
+    """Undo ``install_timing()`` for the connections and serializers it patched."""
+    connection_created.disconnect(dispatch_uid="request-metrics")
+    for connection in connections.all(initialized_only=True):
+        if record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(record_query)
+
+    for serializer_class, data in _untimed_data.items():
+        serializer_class.data = data  # type: ignore[method-assign]
+    _untimed_data.clear()
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure SQL and serializer time of every request when ``REQUEST_METRICS``
+    is on, report it in ``Server-Timing`` and add it to ``metrics_registry``
+    under the URL name. Runs natively in both sync and async request chains,
+    so async views are not moved to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            # Connections and serializers are only patched while it is in use
+            uninstall_timing()
+            raise MiddlewareNotUsed
+        install_timing()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.measure() as metrics:
+            response = self.get_response(request)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        with self.measure() as metrics:
+            response = await self.get_response(request)
+        return self.report(request, response, metrics)
+
+    @contextmanager
+    def measure(self) -> Iterator[RequestMetrics]:
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            current_request.reset(token)
+            metrics.total_time = time.perf_counter() - started
+
+    def report(self, request, response, metrics: RequestMetrics):
+        response.headers["Server-Timing"] = metrics.server_timing()
+        match = request.resolver_match
+        metrics_registry.observe(match.url_name if match else "unmatched", metrics)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_auto_20241023_0014"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                fields=["birth_date"], name="core_userpr_birth_d_dadedc_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,8 @@
 import uuid
+from datetime import date
+from typing import Optional
 from django.db import models
+from django.db.models.functions import ExtractYear
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -69,11 +72,79 @@ class Interest(models.Model):
         unique_together = ("name", "category")
 
 
+def shared_interest(user_id: int) -> models.Exists:
+    """Whether ``user_id`` has the interest of the outer ``UserInterest`` row as well."""
+    return models.Exists(
+        UserInterest.objects.filter(user_id=user_id, interest_id=models.OuterRef("interest_id"))
+    )
+
+
+def years_before(today: date, years: int) -> date:
+    """The same day ``years`` years earlier, February 28 for a February 29."""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+
+class UserProfileQuerySet(models.QuerySet["UserProfile"]):
+    def with_public_data(self, shared_with: Optional[int] = None):
+        """
+        Fetch everything the public profile serializers read (user, age,
+        interests and their categories) in two queries, whatever the number
+        of rows. With ``shared_with``, every interest is also annotated with
+        ``is_shared``: whether that user has it too.
+        """
+        interests = UserInterest.objects.select_related("interest__category").order_by("id")
+        if shared_with is not None:
+            interests = interests.annotate(is_shared=shared_interest(shared_with))
+        return (
+            self.select_related("user")
+            .prefetch_related(models.Prefetch("user__user_interests", queryset=interests))
+            .with_age()
+        )
+
+    def with_age(self, today: Optional[date] = None):
+        """Annotate ``age`` in whole years on ``today``, NULL without a birth date."""
+        today = today or date.today()
+        birthday_ahead = models.Q(birth_date__month__gt=today.month) | models.Q(
+            birth_date__month=today.month, birth_date__day__gt=today.day
+        )
+        return self.annotate(
+            age=models.Value(today.year)
+            - ExtractYear("birth_date")
+            - models.Case(
+                models.When(birthday_ahead, then=models.Value(1)), default=models.Value(0)
+            )
+        )
+
+    def aged_between(
+        self, min_age: Optional[int], max_age: Optional[int], today: Optional[date] = None
+    ):
+        """
+        Profiles whose age on ``today`` is within the bounds, as a
+        ``birth_date`` range the index can serve. Profiles without a birth
+        date are excluded once a bound is given.
+        """
+        today = today or date.today()
+        queryset = self
+        if min_age is not None:
+            queryset = queryset.filter(birth_date__lte=years_before(today, min_age))
+        if max_age is not None:
+            queryset = queryset.filter(birth_date__gt=years_before(today, max_age + 1))
+        return queryset
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     bio = models.TextField(max_length=500, blank=True)
     birth_date = models.DateField(null=True, blank=True)
 
+    objects = UserProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["birth_date"])]
+
     def __str__(self):
         return f"{self.user.email}'s profile"
 
@@ -0,0 +1,32 @@
+import re
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import orjson
+
+# Digit runs long enough to hold an integer outside the 64-bit range
+_LONG_NUMBER = re.compile(rb"\d{19}")
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` decoding UTF-8 bodies with orjson when it is installed.
+    Bodies orjson would read differently from the standard library go to
+    DRF's own parsing: integers beyond 64 bits, which orjson turns into
+    floats, and numbers it refuses, such as ``1e400``. So do the errors, so
+    that they are reported with DRF's messages.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if not _LONG_NUMBER.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(BytesIO(body), media_type, parser_context)
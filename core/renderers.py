@@ -0,0 +1,61 @@
+from typing import Any, Optional
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None  # type: ignore[assignment]
+
+# Dates and times are handed to DRF's encoder so that they are formatted
+# exactly as DRF formats them; everything orjson can't encode goes there too
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+# Strict like DRF's default rendering: NaN and infinities are an error
+_encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Compact UTF-8 JSON of ``data``, as DRF's ``JSONEncoder`` would write it,
+    with orjson when it is installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the standard library handles
+            pass
+    return _encoder.encode(data).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` producing the same bytes with orjson when it is installed
+    and the output is compact, and DRF's own rendering otherwise. Two
+    differences remain. Floats that Python writes in exponent notation may be
+    spelled differently, with the same value: ``1e16`` for ``1e+16``,
+    ``0.00001`` for ``1e-05``. Checking every output for them would cost as
+    much as encoding it. And NaN and infinite floats become ``null`` instead
+    of an error.
+    """
+
+    def render(
+        self, data: Any, accepted_media_type: Optional[str] = None, renderer_context=None
+    ) -> bytes:
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.encoder_class is not JSONEncoder
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        ret = dumps(data)
+        # Like DRF, escape the separators that are invalid in JavaScript strings
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
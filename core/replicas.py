@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Whether the reads of the current request may be served by the replica
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+PIN_KEY = "db:pinned:{}"
+
+
+def pin_to_primary(user_id: Any) -> None:
+    """Keep the reads of ``user_id`` on the primary for ``DATABASE_REPLICA_PIN_SECONDS``."""
+    if settings.DATABASE_REPLICA and settings.DATABASE_REPLICA_PIN_SECONDS:
+        caches[settings.DATABASE_REPLICA_PIN_CACHE_ALIAS].set(
+            PIN_KEY.format(user_id), True, settings.DATABASE_REPLICA_PIN_SECONDS
+        )
+
+
+def is_pinned(user_id: Any) -> bool:
+    return user_id is not None and bool(
+        caches[settings.DATABASE_REPLICA_PIN_CACHE_ALIAS].get(PIN_KEY.format(user_id))
+    )
+
+
+@contextmanager
+def replica_reads(enabled: bool = True) -> Iterator[None]:
+    """Let the reads made inside the block go to the replica, if one is configured."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads made inside ``replica_reads()`` to the ``DATABASE_REPLICA``
+    alias and everything else, writes included, to the primary. The replica
+    holds a copy of the primary, so objects from both may be related.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        if settings.DATABASE_REPLICA and _replica_reads.get():
+            return settings.DATABASE_REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        # Objects read from the replica are saved to the primary too
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, settings.DATABASE_REPLICA}:
+            return True
+        # No opinion: Django then allows relations within any other database
+        return None
+
+
+class ReplicaReadsMixin:
+    """
+    Serve the reads of a view's safe methods from the replica, unless the user
+    wrote through a ``PrimaryPinningMixin`` view recently. Authentication
+    still reads from the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(False):
+            return super().dispatch(request, *args, **kwargs)  # type: ignore[misc]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)  # type: ignore[misc]
+        if (
+            settings.DATABASE_REPLICA
+            and request.method in SAFE_METHODS
+            and not is_pinned(request.user.id)
+        ):
+            _replica_reads.set(True)
+
+
+class PrimaryPinningMixin:
+    """Pin the user to the primary after every successful write through the view."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)  # type: ignore[misc]
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            pin_to_primary(request.user.id)
+        return response
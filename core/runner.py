@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Serve every read from the primary while testing. A configured replica is
+    a test mirror of the primary (see ``DATABASES``): a second connection,
+    which can't see the rows a ``TestCase`` wrote in its transaction. The
+    routing tests set ``DATABASE_REPLICA`` to a database of their own.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.primary_reads = override_settings(DATABASE_REPLICA=None)
+        self.primary_reads.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.primary_reads.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,4 +1,10 @@
+from typing import Any
+
+from django.db.models import QuerySet
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .authentication import UserClaimsRefreshToken
 from .models import (
     CustomUser,
     UserProfile,
@@ -8,6 +14,9 @@ from .models import (
     UserInterest,
 )
 
+# Largest value of the bigint id columns; larger ids make the database error out
+MAX_ID = 2**63 - 1
+
 
 class UserSerializer(serializers.ModelSerializer[CustomUser]):
     class Meta:  # type: ignore
@@ -70,6 +79,34 @@ class UserInterestSerializer(serializers.Serializer):
         return ret
 
 
+def interest_data(interests: QuerySet[Interest]) -> list[dict[str, Any]]:
+    """
+    What ``InterestSerializer(interests, many=True).data`` holds, built
+    straight from ``.values_list()`` rows instead of model instances.
+    """
+    return [
+        {"id": interest_id, "name": name, "category": category_id, "category_name": category_name}
+        for interest_id, name, category_id, category_name in interests.values_list(
+            "id", "name", "category_id", "category__name"
+        )
+    ]
+
+
+def user_interest_data(user_interests: QuerySet[UserInterest]) -> list[dict[str, Any]]:
+    """What ``UserInterestSerializer(user_interests, many=True).data`` holds, from one query."""
+    return [
+        {
+            "user_id": user_id,
+            "interest_id": interest_id,
+            "interest_name": interest_name,
+            "category_name": category_name,
+        }
+        for user_id, interest_id, interest_name, category_name in user_interests.values_list(
+            "user_id", "interest_id", "interest__name", "interest__category__name"
+        )
+    ]
+
+
 class UserInterestCategoryImportanceSerializer(
     serializers.ModelSerializer[UserInterestCategoryImportance]
 ):
@@ -82,14 +119,42 @@ class UserInterestCategoryImportanceSerializer(
 
 
 class UserInterestsBulkUpdateSerializer(serializers.Serializer):
-    interest_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+    # Whether the ids exist is checked by the update statement itself, which
+    # needs them to fit the bigint id column
+    interest_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID), allow_empty=True
+    )
 
-    def validate_interest_ids(self, value):
-        # Check if all provided interest IDs exist
-        existing_ids = set(Interest.objects.filter(id__in=value).values_list("id", flat=True))
-        invalid_ids = set(value) - existing_ids
+    @staticmethod
+    def invalid_ids_error(invalid_ids) -> serializers.ValidationError:
+        return serializers.ValidationError(
+            {"interest_ids": [f"Invalid interest IDs: {', '.join(map(str, sorted(invalid_ids)))}"]}
+        )
+
+
+class UserInterestCategoryImportancesBulkUpdateSerializer(serializers.Serializer):
+    importances = serializers.DictField(
+        child=serializers.IntegerField(min_value=1, max_value=5), allow_empty=True
+    )
+
+    def validate_importances(self, value):
+        try:
+            importances = {
+                int(category_id): importance for category_id, importance in value.items()
+            }
+        except ValueError:
+            raise serializers.ValidationError("Category IDs must be integers.")
+        in_range = [category_id for category_id in importances if 1 <= category_id <= MAX_ID]
+        existing_ids = set(
+            InterestCategory.objects.filter(id__in=in_range).values_list("id", flat=True)
+        )
+        invalid_ids = set(importances) - existing_ids
         if invalid_ids:
             raise serializers.ValidationError(
-                f"Invalid interest IDs: {', '.join(map(str, invalid_ids))}"
+                f"Invalid category IDs: {', '.join(map(str, sorted(invalid_ids)))}"
             )
-        return value
+        return importances
+
+
+class UserClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserClaimsRefreshToken
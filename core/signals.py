@@ -0,0 +1,12 @@
+from django.dispatch import Signal
+
+# Sent after a user's interest set was changed through a path that bypasses the
+# per-row model signals (``bulk_create``, raw SQL). Receivers get ``user_id``,
+# ``added`` and ``removed`` keyword arguments holding sets of interest ids; rows
+# that did go through ``post_save``/``post_delete`` must not be reported again.
+user_interests_changed = Signal()
+
+# Sent after ``UserInterestCategoryImportance`` rows of a user were written in
+# bulk, without ``post_save``. Receivers get ``user_id`` and ``category_ids``,
+# the set of categories whose importance may have changed.
+category_importances_changed = Signal()
@@ -1,3 +1,742 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import LazyTokenUser, UserClaimsRefreshToken, token_denylist
+from .catalog import catalog_cache
+from .metrics import (
+    RequestMetricsMiddleware,
+    install_timing,
+    record_query,
+    metrics_registry,
+)
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .replicas import PIN_KEY, is_pinned, replica_reads
+from .serializers import (
+    InterestSerializer,
+    UserInterestSerializer,
+    interest_data,
+    user_interest_data,
+)
+from .signals import user_interests_changed
+from .models import (
+    CustomUser,
+    Interest,
+    InterestCategory,
+    UserInterest,
+    UserInterestCategoryImportance,
+    UserProfile,
+)
+
+
+class CatalogCacheTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        sports = InterestCategory.objects.create(name="Sports")
+        music = InterestCategory.objects.create(name="Music")
+        Interest.objects.create(name="Football", category=sports)
+        Interest.objects.create(name="Rock", category=music)
+        Interest.objects.create(name="Jazz", category=music)
+
+    def setUp(self):
+        catalog_cache.invalidate()
+        self.addCleanup(catalog_cache.invalidate)
+
+    def test_interest_list_payload(self):
+        """Test the cached payload matches the serializer output and is built in one query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("interest_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["name"], row["category_name"]) for row in response.json()],
+            [("Football", "Sports"), ("Rock", "Music"), ("Jazz", "Music")],
+        )
+        self.assertTrue(response.headers["ETag"].startswith('"'))
+        self.assertNotIn("Last-Modified", response.headers)
+
+    def test_conditional_requests(self):
+        """Test matching validators get a 304 without any query"""
+        url = reverse("interest-category-list")
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.headers["ETag"], response.headers["ETag"])
+
+    def test_invalidated_on_catalog_writes(self):
+        """Test saving a category or interest serves a new payload with a new ETag"""
+        url = reverse("interest-category-list")
+        etag = self.client.get(url).headers["ETag"]
+
+        InterestCategory.objects.create(name="Travel")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertIn("Travel", [row["name"] for row in response.json()])
+
+
+class UserInterestsBulkUpdateTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        sports = InterestCategory.objects.create(name="Sports")
+        music = InterestCategory.objects.create(name="Music")
+        cls.football = Interest.objects.create(name="Football", category=sports)
+        cls.rock = Interest.objects.create(name="Rock", category=music)
+        cls.jazz = Interest.objects.create(name="Jazz", category=music)
+        cls.user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        UserInterest.objects.create(user=cls.user, interest=cls.football)
+        UserInterest.objects.create(user=cls.user, interest=cls.rock)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = reverse("user_interests_bulk_update")
+
+    def post(self, interest_ids):
+        return self.client.post(self.url, {"interest_ids": interest_ids}, format="json")
+
+    def test_replaces_interests(self):
+        """Test the difference is applied and the final rows are returned with their names"""
+        kept = UserInterest.objects.get(user=self.user, interest=self.rock)
+        response = self.post([self.jazz.id, self.rock.id, self.jazz.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "user_id": self.user.id,
+                    "interest_id": self.rock.id,
+                    "interest_name": "Rock",
+                    "category_name": "Music",
+                },
+                {
+                    "user_id": self.user.id,
+                    "interest_id": self.jazz.id,
+                    "interest_name": "Jazz",
+                    "category_name": "Music",
+                },
+            ],
+        )
+        self.assertTrue(UserInterest.objects.filter(id=kept.id).exists())
+        self.assertEqual(
+            set(UserInterest.objects.filter(user=self.user).values_list("interest", flat=True)),
+            {self.rock.id, self.jazz.id},
+        )
+        self.assertEqual(self.post([]).json(), [])
+
+    def test_invalid_ids_change_nothing(self):
+        """Test unknown interest ids are reported and the interests are left alone"""
+        response = self.post([self.jazz.id, 999999, 999998])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"interest_ids": ["Invalid interest IDs: 999998, 999999"]}
+        )
+        self.assertEqual(
+            set(UserInterest.objects.filter(user=self.user).values_list("interest", flat=True)),
+            {self.football.id, self.rock.id},
+        )
+
+    def test_out_of_range_ids(self):
+        """Test ids that cannot be interest ids are rejected before reaching the database"""
+        for interest_id in (2**63, 0, -1):
+            with self.subTest(interest_id=interest_id):
+                response = self.post([self.jazz.id, interest_id])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("interest_ids", response.json())
+
+    @skipUnless(connection.vendor == "postgresql", "Writable CTEs are only used on PostgreSQL")
+    def test_single_statement(self):
+        """Test validation, the diff and the final rows take one statement and one signal"""
+        changes = []
+
+        def receiver(sender, **kwargs):
+            changes.append((kwargs["added"], kwargs["removed"]))
+
+        user_interests_changed.connect(receiver)
+        self.addCleanup(user_interests_changed.disconnect, receiver)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post([self.jazz.id, self.rock.id])
+        statements = [
+            query["sql"] for query in captured.captured_queries if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(len(statements), 1, statements)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(changes, [({self.jazz.id}, {self.football.id})])
+
+
+class UserInterestCategoryImportancesBulkUpdateTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sports = InterestCategory.objects.create(name="Sports")
+        cls.music = InterestCategory.objects.create(name="Music")
+        cls.films = InterestCategory.objects.create(name="Films")
+        cls.user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        UserInterestCategoryImportance.objects.create(
+            user=cls.user, category=cls.sports, importance=1
+        )
+        UserInterestCategoryImportance.objects.create(
+            user=cls.user, category=cls.films, importance=2
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = reverse("user_interest_category_importances_bulk_update")
+
+    def post(self, importances):
+        return self.client.post(self.url, {"importances": importances}, format="json")
+
+    def importances(self):
+        return dict(
+            UserInterestCategoryImportance.objects.filter(user=self.user).values_list(
+                "category__name", "importance"
+            )
+        )
+
+    def test_upserts_importances(self):
+        """Test the map is written in one statement and the user's whole set is returned"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post({self.sports.id: 5, self.music.id: 3})
+        statements = [
+            query["sql"] for query in captured.captured_queries if "SAVEPOINT" not in query["sql"]
+        ]
+        # Validation, the upsert and the final set
+        self.assertEqual(len(statements), 3, statements)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["category_name"], row["importance"]) for row in response.json()],
+            [("Sports", 5), ("Music", 3), ("Films", 2)],
+        )
+        self.assertEqual(self.importances(), {"Sports": 5, "Music": 3, "Films": 2})
+
+    def test_invalid_map_changes_nothing(self):
+        """Test unknown categories and out of range importances are rejected"""
+        for importances, error in (
+            ({self.music.id: 3, 999999: 3}, "Invalid category IDs: 999999"),
+            ({"music": 3}, "Category IDs must be integers."),
+        ):
+            response = self.post(importances)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"importances": [error]})
+        response = self.post({self.music.id: 6})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.importances(), {"Sports": 1, "Films": 2})
+
+    def test_out_of_range_ids(self):
+        """Test ids that cannot be category ids are rejected before reaching the database"""
+        for category_id in (2**63, 0, -1):
+            with self.subTest(category_id=category_id):
+                response = self.post({self.music.id: 3, str(category_id): 3})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json(), {"importances": [f"Invalid category IDs: {category_id}"]}
+                )
+        self.assertEqual(self.importances(), {"Sports": 1, "Films": 2})
+
+
+class ImportUserInterestsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sports = InterestCategory.objects.create(name="Sports")
+        music = InterestCategory.objects.create(name="Music")
+        cls.football = Interest.objects.create(name="Football", category=sports)
+        cls.rock = Interest.objects.create(name="Rock", category=music)
+        cls.jazz = Interest.objects.create(name="Jazz", category=music)
+        cls.existing = CustomUser.objects.create_user(email="old@example.com", password="pass")
+        UserInterest.objects.create(user=cls.existing, interest=cls.football)
+        UserInterest.objects.create(user=cls.existing, interest=cls.rock)
+
+    def import_file(self, suffix, content, *args):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, f"partner{suffix}")
+        with (gzip.open if suffix.endswith(".gz") else open)(path, "wt", encoding="utf-8") as file:
+            file.write(content)
+        output = StringIO()
+        call_command("import_user_interests", path, *args, stdout=output)
+        return output.getvalue()
+
+    def interests(self, email):
+        return set(
+            UserInterest.objects.filter(user__email=email).values_list("interest__name", flat=True)
+        )
+
+    def test_ndjson(self):
+        """Test users are created, interest sets replaced and unknown names skipped"""
+        changes = {}
+
+        def receiver(sender, user_id, added, removed, **kwargs):
+            changes[user_id] = (added, removed)
+
+        user_interests_changed.connect(receiver)
+        self.addCleanup(user_interests_changed.disconnect, receiver)
+        records = [
+            {
+                "email": "old@example.com",
+                "interests": [
+                    {"category": "Music", "interest": "Rock"},
+                    {"category": "Music", "interest": "Jazz"},
+                ],
+            },
+            {
+                "email": "new@example.com",
+                "birth_date": "1990-05-17",
+                "interests": [
+                    {"category": "Sports", "interest": "Football"},
+                    {"category": "Sports", "interest": "Curling"},
+                ],
+            },
+        ]
+        output = self.import_file(
+            ".ndjson", "\n".join(json.dumps(record) for record in records), "--chunk-size", "1"
+        )
+        self.assertIn("1 users created", output)
+        self.assertIn("1 unknown interests skipped", output)
+        self.assertEqual(self.interests("old@example.com"), {"Rock", "Jazz"})
+        self.assertEqual(self.interests("new@example.com"), {"Football"})
+        new = CustomUser.objects.get(email="new@example.com")
+        self.assertFalse(new.has_usable_password())
+        self.assertEqual(str(new.userprofile.birth_date), "1990-05-17")
+        self.assertEqual(
+            changes,
+            {
+                self.existing.id: ({self.jazz.id}, {self.football.id}),
+                new.id: ({self.football.id}, set()),
+            },
+        )
+
+    def test_gzipped_csv_across_chunks(self):
+        """Test a user's rows are merged together even when staged in different chunks"""
+        content = (
+            "email,category,interest\n"
+            "old@example.com,Music,Jazz\n"
+            "other@example.com,,\n"
+            "old@example.com,Sports,Football\n"
+        )
+        self.import_file(".csv.gz", content, "--chunk-size", "1", "--merge-size", "1")
+        self.assertEqual(self.interests("old@example.com"), {"Jazz", "Football"})
+        self.assertEqual(self.interests("other@example.com"), set())
+        self.assertTrue(UserProfile.objects.filter(user__email="other@example.com").exists())
+
+    def test_malformed_input(self):
+        """Test malformed records abort the import before any interest changes"""
+        content = json.dumps({"email": "old@example.com", "interests": []}) + "\n{"
+        with self.assertRaisesMessage(CommandError, "Line 2"):
+            self.import_file(".ndjson", content)
+        self.assertEqual(self.interests("old@example.com"), {"Football", "Rock"})
+
+    def test_mistyped_fields(self):
+        """Test records with fields of the wrong type are reported with their line"""
+        interest = {"category": "Music", "interest": "Jazz"}
+        for record in (
+            {"email": 5, "interests": [interest]},
+            {"email": "new@example.com", "birth_date": 19900101, "interests": [interest]},
+            {"email": "new@example.com", "bio": ["long"], "interests": [interest]},
+            {"email": "new@example.com", "interests": [{**interest, "category": ["Music"]}]},
+            {"email": "new@example.com", "interests": "Jazz"},
+        ):
+            with self.subTest(record=record):
+                content = json.dumps({"email": "first@example.com", "interests": []})
+                content += "\n" + json.dumps(record)
+                with self.assertRaisesMessage(CommandError, "Line 2: "):
+                    self.import_file(".ndjson", content, "--chunk-size", "1")
+        self.assertEqual(self.interests("old@example.com"), {"Football", "Rock"})
+        # Users created for the chunks staged before the error are kept
+        self.assertTrue(CustomUser.objects.filter(email="first@example.com").exists())
+        self.assertFalse(CustomUser.objects.filter(email="new@example.com").exists())
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        token_denylist.clear()
+        self.addCleanup(token_denylist.clear)
+        self.user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        other = CustomUser.objects.create_user(email="other@example.com", password="password123")
+        UserProfile.objects.create(user=other)
+        self.url = reverse("public-profile", args=[other.public_id])
+
+    def get(self, token):
+        return self.client.get(self.url, headers={"Authorization": f"Bearer {token}"})
+
+    def test_token_claims_skip_user_lookup(self):
+        """Test tokens from the token endpoint authenticate without loading the user"""
+        response = self.client.post(
+            reverse("token_obtain_pair"),
+            {"email": "user@example.com", "password": "password123"},
+        )
+        access = response.json()["access"]
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get(access).status_code, 200)
+
+        # Tokens issued without the claims still work, through the lookup
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                self.get(RefreshToken.for_user(self.user).access_token).status_code, 200
+            )
+
+    def test_deactivation_and_password_change_revoke_tokens(self):
+        """Test tokens stop working once the user is deactivated or changes password"""
+        token = UserClaimsRefreshToken.for_user(self.user)
+        token["iat"] -= 1
+        self.user.set_password("new-password123")
+        self.user.save()
+        self.assertEqual(self.get(token.access_token).status_code, 401)
+        self.assertEqual(
+            self.get(UserClaimsRefreshToken.for_user(self.user).access_token).status_code, 200
+        )
+
+        token = UserClaimsRefreshToken.for_user(self.user)
+        token["iat"] -= 1
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(token.access_token).status_code, 401)
+
+    def test_revoked_token(self):
+        """Test a single revoked token is refused while others keep working"""
+        revoked = UserClaimsRefreshToken.for_user(self.user).access_token
+        token_denylist.revoke_token(revoked)
+        self.assertEqual(self.get(revoked).status_code, 401)
+        self.assertEqual(
+            self.get(UserClaimsRefreshToken.for_user(self.user).access_token).status_code, 200
+        )
+
+    def test_lazy_user_loads_model_on_demand(self):
+        """Test claims are read from the token and other attributes from the user row"""
+        user = LazyTokenUser(UserClaimsRefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                (user.id, user.public_id, user.is_staff), (self.user.id, self.user.public_id, False)
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "user@example.com")
+            self.assertEqual(user.instance, self.user)
+
+
+@override_settings(REQUEST_METRICS=True)
+class RequestMetricsTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        catalog_cache.invalidate()
+        metrics_registry.clear()
+        self.staff = CustomUser.objects.create_user(
+            email="staff@example.com", password="password123", is_staff=True
+        )
+
+    def test_server_timing(self):
+        """Test responses report their SQL and serializer time"""
+        response = self.client.get(reverse("interest_list"))
+        timing = response.headers["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn("SELECT", timing)
+        self.assertIn("serializer;dur=", timing)
+
+    async def test_async_requests(self):
+        """Test async views are measured in the async chain, their ORM queries included"""
+
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(view)))
+
+        # Unlike a worker's, the test database connection predates the middleware
+        await sync_to_async(install_timing)()
+        response = await self.async_client.get(reverse("interest_list_async"))
+        timing = response.headers["Server-Timing"]
+        self.assertIn('desc="1 queries"', timing)
+        self.assertIn("SELECT", timing)
+
+    def test_serializers_unpatched_when_off(self):
+        """Test the query and serializer timing is removed when the middleware is not used"""
+        install_timing()
+        self.assertIn(record_query, connection.execute_wrappers)
+        with self.assertRaises(MiddlewareNotUsed), self.settings(REQUEST_METRICS=False):
+            RequestMetricsMiddleware(lambda request: None)
+        self.assertNotIn(record_query, connection.execute_wrappers)
+        for serializer_class in (Serializer, ListSerializer):
+            self.assertEqual(
+                serializer_class.data.fget.__qualname__, f"{serializer_class.__name__}.data"
+            )
+
+    def test_metrics_endpoint(self):
+        """Test the histograms are served to staff only, labelled by URL name"""
+        self.client.get(reverse("interest_list"))
+        self.client.get(reverse("interest_list"))
+
+        user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('bestman_request_queries_bucket{view="interest_list",le="1.0"} 2', body)
+        self.assertIn('bestman_request_duration_seconds_count{view="interest_list"} 2', body)
+        self.assertIn("bestman_match_cache_hits_total 0", body)
+
+    @skipUnless(connection.settings_dict["OPTIONS"].get("pool"), "needs a connection pool")
+    def test_pool_metrics(self):
+        """Test the connection pool statistics are exported per database alias"""
+        self.client.force_authenticate(self.staff)
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn("# TYPE bestman_db_pool_connections gauge", body)
+        self.assertIn('bestman_db_pool_requests_total{alias="default"}', body)
+
+
+class ReplicaRoutingTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+
+    @override_settings(DATABASE_REPLICA="replica")
+    def test_router(self):
+        """Test only reads made inside replica_reads() go to the replica"""
+        self.assertEqual(router.db_for_read(UserProfile), "default")
+        with replica_reads():
+            self.assertEqual(router.db_for_read(UserProfile), "replica")
+            self.assertEqual(router.db_for_write(UserProfile), "default")
+            with replica_reads(False):
+                self.assertEqual(router.db_for_read(UserProfile), "default")
+        self.assertEqual(router.db_for_read(UserProfile), "default")
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_router_without_replica(self):
+        """Test every read goes to the primary when no replica is configured"""
+        with replica_reads():
+            self.assertEqual(router.db_for_read(UserProfile), "default")
+
+    @override_settings(DATABASE_REPLICA="replica")
+    def test_writes_pin_user(self):
+        """Test successful writes pin the user to the primary, reads and failures don't"""
+        self.client.get(reverse("profile"))
+        self.assertFalse(is_pinned(self.user.id))
+
+        response = self.client.post(
+            reverse("user_interests_bulk_update"), {"interest_ids": [0]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(is_pinned(self.user.id))
+
+        self.client.patch(reverse("profile"), {"bio": "Updated"}, format="json")
+        self.assertTrue(is_pinned(self.user.id))
+
+
+@skipUnless("test_replica" in settings.DATABASES, "needs DATABASE_TEST_REPLICA_URL")
+@override_settings(DATABASE_REPLICA="test_replica")
+class ReplicaReadTests(TestCase):
+    """Run with e.g. DATABASE_TEST_REPLICA_URL=sqlite:////tmp/replica.sqlite3"""
+
+    client_class = APIClient
+    # Only existing aliases; the replica mirror must stay out of the transaction
+    databases = {"default", "test_replica"} & settings.DATABASES.keys()
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.invalidate()
+        self.user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        UserProfile.objects.create(user=self.user, bio="Primary")
+        # A lagging copy of the same rows
+        CustomUser.objects.using(settings.DATABASE_REPLICA).create(
+            id=self.user.id, email=self.user.email, public_id=self.user.public_id
+        )
+        UserProfile.objects.using(settings.DATABASE_REPLICA).create(
+            user_id=self.user.id, bio="Replica"
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse("public-profile", kwargs={"user_id": self.user.public_id})
+
+    def test_reads_from_replica(self):
+        """Test matching, public profile and catalog reads are served by the replica"""
+        self.assertEqual(self.client.get(self.url).data["bio"], "Replica")
+        self.assertEqual(
+            [
+                profile["bio"]
+                for profile in self.client.get(reverse("matching_profiles")).data["results"]
+            ],
+            ["Replica"],
+        )
+
+        InterestCategory.objects.using(settings.DATABASE_REPLICA).create(name="Music")
+        response = self.client.get(reverse("interest-category-list"))
+        self.assertEqual([category["name"] for category in response.json()], ["Music"])
+
+    def test_reads_own_writes(self):
+        """Test a user's reads stay on the primary for a while after they write"""
+        self.client.patch(reverse("profile"), {"bio": "Updated"}, format="json")
+        self.assertEqual(self.client.get(self.url).data["bio"], "Updated")
+
+        other = CustomUser.objects.create_user(email="other@example.com", password="password123")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).data["bio"], "Replica")
+
+        self.client.force_authenticate(self.user)
+        cache.delete(PIN_KEY.format(self.user.id))
+        self.assertEqual(self.client.get(self.url).data["bio"], "Replica")
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_matches_drf(self):
+        """Test the fast renderer writes the same bytes as DRF's JSONRenderer"""
+        data = {
+            "text": 'Héllo \u2028 \u2029 "quoted"',
+            "uuid": uuid.uuid4(),
+            "datetime": datetime(2024, 10, 18, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            "date": date(2024, 10, 18),
+            "decimal": Decimal("1.50"),
+            "big": 2**70,
+            "keys": {1: None, "nested": [1.5, True, ("tuple",)]},
+            "floats": [123.25, -0.5, 0.0, 1e-4, 9007199254740993.0, 1 / 3],
+            "text_numbers": "1e5 0.00001",
+        }
+        for value in (data, [data, data], None, [], 1.5):
+            self.assertEqual(FastJSONRenderer().render(value), JSONRenderer().render(value))
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+        # Floats in exponent notation may be spelled differently, never with another value
+        exponents = {"floats": [1e16, -1.5e-7, 0.00001, 1e308, 5e-324]}
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(exponents)),
+            json.loads(JSONRenderer().render(exponents)),
+        )
+
+    def test_parser(self):
+        """Test the fast parser reads what DRF's JSONParser reads and rejects the same errors"""
+        body = '{"interest_ids": [1, 2], "bio": "H\u00e9llo", "nested": {"ok": null}}'.encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        for invalid in (b"{", b'{"value": NaN}', b"\xff"):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(invalid))
+        # Numbers beyond orjson's range are read exactly as the standard library reads them
+        for number in (2**64 + 1, -(2**63) - 1, 10**30):
+            body = json.dumps({"value": number}).encode()
+            self.assertEqual(FastJSONParser().parse(BytesIO(body)), {"value": number})
+        self.assertEqual(FastJSONParser().parse(BytesIO(b"[1e400]")), [float("inf")])
+
+    def test_values_serializers(self):
+        """Test interests built from values rows render exactly like the serializers' output"""
+        category = InterestCategory.objects.create(name="Mūsic")
+        user = CustomUser.objects.create_user(email="user@example.com", password="password123")
+        for name in ("Jazz", "Rock\u2028"):
+            UserInterest.objects.create(
+                user=user, interest=Interest.objects.create(name=name, category=category)
+            )
+        interests = Interest.objects.select_related("category").order_by("id")
+        with self.assertNumQueries(1):
+            data = interest_data(interests)
+        self.assertEqual(
+            JSONRenderer().render(data),
+            JSONRenderer().render(InterestSerializer(interests, many=True).data),
+        )
+        user_interests = UserInterest.objects.select_related("interest__category").order_by("id")
+        with self.assertNumQueries(1):
+            data = user_interest_data(user_interests)
+        self.assertEqual(
+            JSONRenderer().render(data),
+            JSONRenderer().render(UserInterestSerializer(user_interests, many=True).data),
+        )
+
+
+class SeedMatchingDataTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            "seed_matching_data",
+            users=60,
+            categories=3,
+            interests_per_category=4,
+            batch_size=25,
+            stdout=StringIO(),
+            **options,
+        )
+        return (
+            set(CustomUser.objects.values_list("email", "public_id")),
+            set(UserInterest.objects.values_list("user__email", "interest__name")),
+        )
+
+    def test_seed_is_reproducible(self):
+        """Test the same seed regenerates identical users and interests"""
+        users, interests = self.seed(seed=7)
+        self.assertEqual(len(users), 60)
+        self.assertEqual(UserProfile.objects.count(), 60)
+        self.assertEqual(Interest.objects.count(), 12)
+        self.assertTrue(CustomUser.objects.first().check_password("seedpassword"))
+
+        self.assertEqual(self.seed(seed=7, clear=True), (users, interests))
+        self.assertNotEqual(self.seed(seed=8, clear=True)[1], interests)
+
+
+class BenchmarkEndpointsTests(TestCase):
+    def setUp(self):
+        catalog_cache.invalidate()
+        self.addCleanup(catalog_cache.invalidate)
+
+    def test_writes_results(self):
+        """Test every endpoint is measured and written as JSON"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmark_endpoints",
+                sizes="30",
+                iterations=2,
+                allow_non_postgres=True,
+                output=output.name,
+                stdout=StringIO(),
+            )
+            report = json.load(output)
+
+        self.assertEqual(
+            [result["endpoint"] for result in report["results"]],
+            [
+                "common-interests",
+                "public-profile",
+                "user-interests-bulk-update",
+                "interest-list",
+                "interest-category-list",
+            ],
+        )
+        for result in report["results"]:
+            self.assertEqual(result["size"], 30)
+            self.assertGreater(result["queries"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+
+    @skipIf(connection.vendor == "postgresql", "Only refused on other databases")
+    def test_requires_postgres(self):
+        """Test the benchmark refuses other databases unless told otherwise"""
+        with self.assertRaisesMessage(CommandError, "PostgreSQL"):
+            call_command("benchmark_endpoints", sizes="30", stdout=StringIO())
@@ -1,13 +1,16 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .async_views import AsyncInterestCategoryListView, AsyncInterestListView
 from .views import (
     CreateUserView,
     UserProfileView,
     InterestCategoryListView,
     InterestListView,
+    MetricsView,
     UserInterestView,
     UserInterestCategoryImportanceView,
     UserInterestsBulkUpdateView,
+    UserInterestCategoryImportancesBulkUpdateView,
 )
 
 urlpatterns = [
@@ -27,9 +30,21 @@ urlpatterns = [
         UserInterestCategoryImportanceView.as_view(),
         name="user_interest_category_importances",
     ),
+    path(
+        "user-interest-category-importances/bulk-update/",
+        UserInterestCategoryImportancesBulkUpdateView.as_view(),
+        name="user_interest_category_importances_bulk_update",
+    ),
     path(
         "user-interests-bulk-update/",
         UserInterestsBulkUpdateView.as_view(),
         name="user_interests_bulk_update",
     ),
+    path(
+        "async/interest-categories/",
+        AsyncInterestCategoryListView.as_view(),
+        name="interest-category-list-async",
+    ),
+    path("async/interests/", AsyncInterestListView.as_view(), name="interest_list_async"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
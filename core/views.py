@@ -2,9 +2,11 @@ from typing import Any, Dict
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.db.models import Prefetch
+from django.http import HttpResponse
 
 from core.models import (
     UserProfile,
@@ -13,6 +15,12 @@ from core.models import (
     UserInterest,
     UserInterestCategoryImportance,
 )
+from .authentication import StatelessJWTAuthentication
+from .catalog import catalog_cache
+from .interest_updates import replace_user_interests
+from .metrics import metrics_registry
+from .renderers import FastJSONRenderer
+from .replicas import PrimaryPinningMixin, ReplicaReadsMixin
 from .serializers import (
     UserCreateSerializer,
     UserProfileSerializer,
@@ -21,7 +29,11 @@ from .serializers import (
     UserInterestSerializer,
     UserInterestCategoryImportanceSerializer,
     UserInterestsBulkUpdateSerializer,
+    UserInterestCategoryImportancesBulkUpdateSerializer,
+    interest_data,
+    user_interest_data,
 )
+from .signals import category_importances_changed
 
 CustomUser = get_user_model()
 
@@ -32,7 +44,7 @@ class CreateUserView(generics.CreateAPIView):
     permission_classes = (permissions.AllowAny,)
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(PrimaryPinningMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -55,19 +67,46 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return obj
 
 
-class InterestCategoryListView(generics.ListAPIView):
+class CatalogListView(ReplicaReadsMixin, generics.ListAPIView):
+    """
+    Anonymous catalog listing served from the pre-serialized catalog cache,
+    with a content ETag validator. Conditional requests that hit are
+    answered with 304 without touching the database.
+    """
+
+    permission_classes = (permissions.AllowAny,)
+    # Nothing to authenticate, and JWT auth would cost a user lookup
+    authentication_classes = ()
+
+    # Key of the payload in the catalog cache, shared with the async views
+    catalog_name: str
+
+    def list(self, request, *args, **kwargs):
+        return catalog_cache.respond(request, self.catalog_name, self.render_catalog)
+
+    def render_catalog(self) -> bytes:
+        return FastJSONRenderer().render(self.get_catalog_data())
+
+    def get_catalog_data(self) -> Any:
+        return self.get_serializer(self.get_queryset(), many=True).data
+
+
+class InterestCategoryListView(CatalogListView):
+    catalog_name = "interest-categories"
     queryset = InterestCategory.objects.all()
     serializer_class = InterestCategorySerializer
-    permission_classes = (permissions.AllowAny,)
 
 
-class InterestListView(generics.ListAPIView):
-    queryset = Interest.objects.all()
+class InterestListView(CatalogListView):
+    catalog_name = "interests"
+    queryset = Interest.objects.select_related("category")
     serializer_class = InterestSerializer
-    permission_classes = (permissions.AllowAny,)
 
+    def get_catalog_data(self) -> Any:
+        return interest_data(self.get_queryset())
 
-class UserInterestView(generics.ListCreateAPIView):
+
+class UserInterestView(PrimaryPinningMixin, generics.ListCreateAPIView):
     serializer_class = UserInterestSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -76,6 +115,9 @@ class UserInterestView(generics.ListCreateAPIView):
             Prefetch("interest", queryset=Interest.objects.select_related("category"))
         )
 
+    def list(self, request, *args, **kwargs):
+        return Response(user_interest_data(UserInterest.objects.filter(user=request.user)))
+
     def perform_create(self, serializer: BaseSerializer) -> None:
         user = self.request.user
         validated_data: Dict[str, Any] = getattr(serializer, "validated_data", {})
@@ -86,7 +128,7 @@ class UserInterestView(generics.ListCreateAPIView):
 
 
 class UserInterestCategoryImportanceView(
-    generics.ListCreateAPIView[UserInterestCategoryImportance]
+    PrimaryPinningMixin, generics.ListCreateAPIView[UserInterestCategoryImportance]
 ):
     serializer_class = UserInterestCategoryImportanceSerializer
     permission_classes = (permissions.IsAuthenticated,)
@@ -106,8 +148,10 @@ class UserInterestCategoryImportanceView(
             serializer.instance = user_category_importance
 
 
-class UserInterestsBulkUpdateView(generics.GenericAPIView):
+class UserInterestsBulkUpdateView(PrimaryPinningMixin, generics.GenericAPIView):
     serializer_class = UserInterestsBulkUpdateSerializer
+    # Only request.user.id is needed, which the token carries
+    authentication_classes = (StatelessJWTAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     @transaction.atomic
@@ -115,29 +159,66 @@ class UserInterestsBulkUpdateView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        user = request.user
-        new_interest_ids: set[int] = set(serializer.validated_data["interest_ids"])
+        update = replace_user_interests(request.user.id, serializer.validated_data["interest_ids"])
+        if update.invalid:
+            raise serializer.invalid_ids_error(update.invalid)
 
-        # Remove existing UserInterests not in the new set
-        UserInterest.objects.filter(user=user).exclude(interest__id__in=new_interest_ids).delete()
+        # The rows come with their interest and category, so this runs no query
+        result_serializer = UserInterestSerializer(update.interests, many=True)
+
+        return Response(result_serializer.data, status=status.HTTP_200_OK)
 
-        # Add new UserInterests
-        existing_interest_ids: set[int] = set(
-            UserInterest.objects.filter(user=user).values_list("interest__id", flat=True)
-        )
-        interests_to_add = new_interest_ids - existing_interest_ids
 
-        new_user_interests = [
-            UserInterest(user=user, interest_id=interest_id) for interest_id in interests_to_add
-        ]
-        UserInterest.objects.bulk_create(new_user_interests)
+class UserInterestCategoryImportancesBulkUpdateView(PrimaryPinningMixin, generics.GenericAPIView):
+    """
+    Set the importance of many categories at once from a ``{category_id:
+    importance}`` map and return all of the user's importances. Categories
+    missing from the map keep their importance.
+    """
 
-        # Fetch updated UserInterests
-        updated_user_interests = UserInterest.objects.filter(user=user).select_related(
-            "interest__category"
+    serializer_class = UserInterestCategoryImportancesBulkUpdateSerializer
+    # Only request.user.id is needed, which the token carries
+    authentication_classes = (StatelessJWTAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @transaction.atomic
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user_id = request.user.id
+        importances: dict[int, int] = serializer.validated_data["importances"]
+        UserInterestCategoryImportance.objects.bulk_create(
+            [
+                UserInterestCategoryImportance(
+                    user_id=user_id, category_id=category_id, importance=importance
+                )
+                for category_id, importance in importances.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "category"],
+            update_fields=["importance"],
         )
+        # bulk_create doesn't send post_save
+        category_importances_changed.send(
+            sender=UserInterestCategoryImportance, user_id=user_id, category_ids=set(importances)
+        )
+
+        importances_serializer = UserInterestCategoryImportanceSerializer(
+            UserInterestCategoryImportance.objects.filter(user_id=user_id)
+            .select_related("category")
+            .order_by("category_id"),
+            many=True,
+        )
+        return Response(importances_serializer.data, status=status.HTTP_200_OK)
 
-        # Serialize the result
-        result_serializer = UserInterestSerializer(updated_user_interests, many=True)
 
-        return Response(result_serializer.data, status=status.HTTP_200_OK)
+class MetricsView(APIView):
+    """Request metrics of this process in the Prometheus text format, for staff."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MatchingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'matching'
+
+    def ready(self):
+        from core.metrics import metrics_registry
+        from . import signals  # noqa: F401
+        from .cache import match_cache
+        from .index import interest_index
+
+        interest_index.max_age = settings.MATCHING_INTEREST_INDEX_MAX_AGE
+        metrics_registry.collectors.append(match_cache.metrics)
@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+
+from core.async_views import AsyncAPIView, json_response
+from core.models import UserProfile
+from .cache import match_cache
+from .filters import AgeRangeFilter
+from .index import interest_index
+from .pagination import CommonInterestsPagination
+from .serializers import MatchSerializer, PublicProfileSerializer
+from .views import CommonInterestsUsersView
+
+
+class AsyncPublicProfileView(AsyncAPIView):
+    stateless_authentication = True
+
+    async def get(self, request, user_id):
+        profile = (
+            await UserProfile.objects.with_public_data().filter(user__public_id=user_id).afirst()
+        )
+        if profile is None:
+            raise NotFound("No UserProfile matches the given query.")
+        return json_response(PublicProfileSerializer(profile).data)
+
+
+class AsyncCommonInterestsUsersView(AsyncAPIView):
+    """
+    Async ``users/common-interests/``. The default shared-count ranking, from
+    the database or a warm interest index, is served on the event loop with
+    the sync view's querysets, age filter included. Every other mode (weighted
+    scoring, LSH, the match cache, age ranges over the index) is handed to the
+    sync view itself in a thread, so both URLs always give the same results.
+    """
+
+    stateless_authentication = True
+
+    async def get(self, request):
+        sync_view = CommonInterestsUsersView()
+        sync_view.request = request
+        sync_view.scoring = sync_view.get_scoring(request.GET)
+        age_filter = AgeRangeFilter()
+        use_index = settings.MATCHING_INTEREST_INDEX and interest_index.ensure_warm()
+        in_database = sync_view.ranks_in_database(use_index)
+        if (
+            sync_view.scoring != sync_view.SCORING_SHARED
+            or sync_view.approximate
+            or match_cache.enabled
+            or (not in_database and age_filter.get_bounds(request) != (None, None))
+        ):
+            return await sync_to_async(self.respond_sync)(request)
+
+        paginator = CommonInterestsPagination()
+        if in_database:
+            queryset = age_filter.filter_queryset(request, sync_view.get_queryset(), sync_view)
+            page = await paginator.apaginate_queryset(queryset, request)
+        else:
+            ranked = interest_index.top_matches(request.user.id)
+            page = paginator.paginate_ranked(ranked, request, key=lambda match: match[1:])
+            user_ids = [match[0] for match in page]
+            profiles = {
+                profile.user_id: profile
+                async for profile in UserProfile.objects.with_public_data(
+                    shared_with=request.user.id
+                ).filter(user_id__in=user_ids)
+            }
+            page = [profiles[user_id] for user_id in user_ids if user_id in profiles]
+
+        data = MatchSerializer(page, many=True).data
+        return json_response({"next": paginator.get_next_link(), "results": data})
+
+    @staticmethod
+    def respond_sync(request):
+        return CommonInterestsUsersView.as_view()(request).render()
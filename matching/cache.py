@@ -0,0 +1,112 @@
+from array import array
+from typing import Callable, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .scoring import SCORINGS
+
+# Bump when the stored layout changes so old entries are simply missed
+CACHE_FORMAT = 1
+
+
+def encode_ranking(matches: Sequence[tuple]) -> tuple:
+    """
+    Pack ``(user_id, *ordering values)`` tuples into flat arrays. The last
+    ordering value is always the email, the ones before it are numbers.
+    """
+    width = len(matches[0]) if matches else 0
+    user_ids = array("q", (match[0] for match in matches))
+    numbers = []
+    for column in range(1, width - 1):
+        values = [match[column] for match in matches]
+        typecode = "q" if all(isinstance(value, int) for value in values) else "d"
+        numbers.append((typecode, array(typecode, values).tobytes()))
+    emails = "\n".join(match[-1] for match in matches)
+    return (width, user_ids.tobytes(), numbers, emails)
+
+
+def decode_ranking(packed: tuple) -> list[tuple]:
+    width, user_ids_bytes, number_bytes, emails = packed
+    if not width:
+        return []
+    user_ids = array("q")
+    user_ids.frombytes(user_ids_bytes)
+    columns: list[list] = [user_ids.tolist()]
+    for typecode, raw in number_bytes:
+        column = array(typecode)
+        column.frombytes(raw)
+        columns.append(column.tolist())
+    columns.append(emails.split("\n"))
+    return list(zip(*columns))
+
+
+class MatchCache:
+    """
+    Per-user cache of ranked match lists, stored as packed id and score arrays
+    rather than serialized profiles.
+
+    Entries are deleted when the user's own interests or importances change and
+    expire after ``MATCHING_CACHE_TIMEOUT`` seconds, which bounds how long
+    changes made by other users go unnoticed. Hit and miss counters live in the
+    cache backend so they add up across processes.
+    """
+
+    HITS_KEY = "matching:cache:hits"
+    MISSES_KEY = "matching:cache:misses"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.MATCHING_CACHE_TIMEOUT)
+
+    @property
+    def cache(self):
+        return caches[settings.MATCHING_CACHE_ALIAS]
+
+    def key(self, user_id: int, scoring: str) -> str:
+        return f"matching:ranking:{CACHE_FORMAT}:{scoring}:{user_id}"
+
+    def get_or_compute(
+        self, user_id: int, scoring: str, compute: Callable[[], Sequence[tuple]]
+    ) -> tuple[list[tuple], bool]:
+        """Return the ranking of ``user_id`` and whether it came from the cache."""
+        key = self.key(user_id, scoring)
+        packed: Optional[tuple] = self.cache.get(key)
+        if packed is not None:
+            self._count(self.HITS_KEY)
+            return decode_ranking(packed), True
+
+        self._count(self.MISSES_KEY)
+        ranking = list(compute())
+        self.cache.set(key, encode_ranking(ranking), timeout=settings.MATCHING_CACHE_TIMEOUT)
+        return ranking, False
+
+    def invalidate(self, user_id: int) -> None:
+        if self.enabled:
+            self.cache.delete_many([self.key(user_id, scoring) for scoring in SCORINGS])
+
+    def _count(self, key: str) -> None:
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # First use, or evicted: start over (racing processes may lose one count)
+            self.cache.add(key, 0, timeout=None)
+            self.cache.incr(key)
+
+    def stats(self) -> dict[str, int]:
+        counters = self.cache.get_many([self.HITS_KEY, self.MISSES_KEY])
+        return {
+            "hits": counters.get(self.HITS_KEY, 0),
+            "misses": counters.get(self.MISSES_KEY, 0),
+        }
+
+    def metrics(self) -> list[str]:
+        """``stats()`` as Prometheus counters, for the metrics endpoint."""
+        lines = []
+        for name, value in self.stats().items():
+            metric = f"bestman_match_cache_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return lines
+
+
+match_cache = MatchCache()
@@ -0,0 +1,45 @@
+import zlib
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+
+from core.models import UserProfile
+from core.renderers import dumps
+from .serializers import PUBLIC_PROFILE_FIELDS, public_profile_data
+
+
+def profile_lines(chunk_size: int) -> Iterator[bytes]:
+    """
+    Every public profile as newline-delimited JSON, one ``bytes`` per chunk.
+    Profile rows are read with a server-side cursor where the database has
+    them, and the interests of each chunk are read with one query.
+    """
+    rows = UserProfile.objects.with_age().order_by("id").values_list(*PUBLIC_PROFILE_FIELDS)
+    rows = rows.iterator(chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield b"".join(dumps(profile) + b"\n" for profile in public_profile_data(chunk).values())
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+async def aiterate(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Stream a sync iterator from an async response, one chunk per call in the
+    ORM's thread, so ASGI servers don't read it into memory at once.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        # Release the server-side cursor if the client went away early
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
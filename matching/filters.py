@@ -0,0 +1,48 @@
+from typing import Callable, Optional, Sequence
+
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import UserProfile
+from .serializers import AgeRangeSerializer
+
+
+class AgeRangeFilter(BaseFilterBackend):
+    """
+    Keep the profiles aged between the ``min_age`` and ``max_age`` query
+    parameters (both optional and inclusive), as a ``birth_date`` range.
+    """
+
+    # Ranges with at most this many users are read whole to filter rankings
+    max_prefetched_ids = 5000
+
+    def get_bounds(self, request) -> tuple[Optional[int], Optional[int]]:
+        # DRF requests have query_params, plain Django ones (async views) GET
+        serializer = AgeRangeSerializer(data=getattr(request, "query_params", request.GET))
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get("min_age"), serializer.validated_data.get("max_age")
+
+    def filter_queryset(self, request, queryset, view):
+        min_age, max_age = self.get_bounds(request)
+        return queryset.aged_between(min_age, max_age)
+
+    def ranked_filter(self, request) -> Optional[Callable[[Sequence[tuple]], list[tuple]]]:
+        """
+        A ``keep`` function for ``KeysetPagination.paginate_ranked`` dropping
+        the ``(user_id, ...)`` matches outside the range, or None without one.
+        """
+        min_age, max_age = self.get_bounds(request)
+        if min_age is None and max_age is None:
+            return None
+        in_range = UserProfile.objects.aged_between(min_age, max_age).values_list(
+            "user_id", flat=True
+        )
+        # A narrow range is read whole with one index scan
+        few = set(in_range[: self.max_prefetched_ids + 1])
+        if len(few) <= self.max_prefetched_ids:
+            return lambda matches: [match for match in matches if match[0] in few]
+
+        def keep(matches: Sequence[tuple]) -> list[tuple]:
+            user_ids = set(in_range.filter(user_id__in=[match[0] for match in matches]))
+            return [match for match in matches if match[0] in user_ids]
+
+        return keep
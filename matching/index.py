@@ -0,0 +1,197 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+from django.db import connections
+
+from core.models import UserInterest, UserProfile
+
+
+class InterestIndex:
+    """
+    In-memory inverted index of interest id -> sorted array of user ids.
+
+    Shared-interest counts are answered by merging the posting lists of the
+    requesting user's interests instead of self-joining ``UserInterest``.
+    Only users that have a ``UserProfile`` are returned as candidates, which
+    mirrors the SQL path of ``CommonInterestsUsersView``.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._postings: dict[int, array] = {}
+        self._user_interests: dict[int, set[int]] = {}
+        self._emails: dict[int, str] = {}
+        self._built_at: Optional[float] = None
+        self._building = False
+        # Writes that arrive while a build is running are replayed on top of it
+        self._journal: list[Callable[[], None]] = []
+
+    @property
+    def is_warm(self) -> bool:
+        if self._built_at is None:
+            return False
+        return self.max_age is None or time.monotonic() - self._built_at < self.max_age
+
+    def build(self) -> None:
+        """Load the whole index from the database, replacing the current one."""
+        with self._lock:
+            self._building = True
+            self._journal = []
+        try:
+            emails = dict(UserProfile.objects.values_list("user_id", "user__email").iterator())
+            postings: dict[int, array] = {}
+            user_interests: dict[int, set[int]] = {}
+            rows = (
+                UserInterest.objects.order_by("interest_id", "user_id")
+                .values_list("interest_id", "user_id")
+                .iterator(chunk_size=10_000)
+            )
+            for interest_id, user_id in rows:
+                posting = postings.get(interest_id)
+                if posting is None:
+                    posting = postings[interest_id] = array("q")
+                posting.append(user_id)
+                user_interests.setdefault(user_id, set()).add(interest_id)
+        except Exception:
+            with self._lock:
+                self._building = False
+                self._journal = []
+            raise
+
+        with self._lock:
+            self._postings = postings
+            self._user_interests = user_interests
+            self._emails = emails
+            self._built_at = time.monotonic()
+            self._building = False
+            journal, self._journal = self._journal, []
+            for operation in journal:
+                operation()
+
+    def ensure_warm(self) -> bool:
+        """
+        Return whether the index can serve reads right now. A cold or expired
+        index is rebuilt in a background thread so the caller can fall back to
+        SQL in the meantime.
+        """
+        if self.is_warm:
+            return True
+        with self._lock:
+            if not self._building:
+                self._building = True
+                threading.Thread(target=self._build_in_background, daemon=True).start()
+        return False
+
+    def _build_in_background(self) -> None:
+        try:
+            self.build()
+        finally:
+            # The thread opened its own connection; don't leak it
+            connections.close_all()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings = {}
+            self._user_interests = {}
+            self._emails = {}
+            self._built_at = None
+
+    def _apply(self, operation: Callable[[], None]) -> None:
+        with self._lock:
+            if self._building:
+                self._journal.append(operation)
+            if self._built_at is not None:
+                operation()
+
+    def add_interests(self, user_id: int, interest_ids: Iterable[int]) -> None:
+        interest_ids = tuple(interest_ids)
+
+        def operation():
+            current = self._user_interests.setdefault(user_id, set())
+            for interest_id in interest_ids:
+                if interest_id in current:
+                    continue
+                current.add(interest_id)
+                insort(self._postings.setdefault(interest_id, array("q")), user_id)
+
+        self._apply(operation)
+
+    def remove_interests(self, user_id: int, interest_ids: Iterable[int]) -> None:
+        interest_ids = tuple(interest_ids)
+
+        def operation():
+            current = self._user_interests.get(user_id)
+            if not current:
+                return
+            for interest_id in interest_ids:
+                if interest_id not in current:
+                    continue
+                current.discard(interest_id)
+                posting = self._postings[interest_id]
+                position = bisect_left(posting, user_id)
+                if position < len(posting) and posting[position] == user_id:
+                    del posting[position]
+
+        self._apply(operation)
+
+    def set_profile(self, user_id: int, email: str) -> None:
+        self._apply(lambda: self._emails.__setitem__(user_id, email))
+
+    def remove_profile(self, user_id: int) -> None:
+        self._apply(lambda: self._emails.pop(user_id, None))
+
+    def update_email(self, user_id: int, email: str) -> None:
+        def operation():
+            if user_id in self._emails:
+                self._emails[user_id] = email
+
+        self._apply(operation)
+
+    def interests_of(self, user_id: int) -> frozenset[int]:
+        with self._lock:
+            return frozenset(self._user_interests.get(user_id, ()))
+
+    def postings_for(self, user_id: int) -> dict[int, array]:
+        """Copy the posting lists of every interest ``user_id`` has."""
+        with self._lock:
+            return {
+                interest_id: array("q", self._postings.get(interest_id, ()))
+                for interest_id in self._user_interests.get(user_id, ())
+            }
+
+    def emails_for(self, user_ids: Iterable[int]) -> dict[int, str]:
+        """Map the given ids of profiled users to their email; others are left out."""
+        with self._lock:
+            emails = self._emails
+            return {user_id: emails[user_id] for user_id in user_ids if user_id in emails}
+
+    def shared_counts(self, user_id: int) -> Counter:
+        """Map every other profiled user to the number of interests shared with ``user_id``."""
+        with self._lock:
+            counts: Counter = Counter()
+            for interest_id in self._user_interests.get(user_id, ()):
+                counts.update(self._postings.get(interest_id, ()))
+            counts.pop(user_id, None)
+            emails = self._emails
+            for other_id in [other_id for other_id in counts if other_id not in emails]:
+                del counts[other_id]
+            return counts
+
+    def top_matches(self, user_id: int) -> list[tuple[int, int, str]]:
+        """
+        Return ``(user_id, shared_count, email)`` triples ordered by shared
+        count descending, then email, the same order as the SQL path.
+        """
+        counts = self.shared_counts(user_id)
+        emails = self.emails_for(counts)
+        matches = [(other_id, count, emails[other_id]) for other_id, count in counts.items()]
+        matches.sort(key=lambda match: (-match[1], match[2]))
+        return matches
+
+
+interest_index = InterestIndex()
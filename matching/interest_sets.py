@@ -0,0 +1,115 @@
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Func, IntegerField, QuerySet, Subquery
+
+from core.models import UserInterest, UserProfile
+from .models import UserInterestSet
+
+TABLE = UserInterestSet._meta.db_table
+USER_INTERESTS = UserInterest._meta.db_table
+
+# Both statements merge with the row as it is when the statement runs, so
+# concurrent writes for the same user don't overwrite each other
+ADD_SQL = f"""
+INSERT INTO {TABLE} AS interest_set (user_id, interest_ids)
+VALUES (%s, %s::bigint[])
+ON CONFLICT (user_id) DO UPDATE SET interest_ids = ARRAY(
+    SELECT DISTINCT unnest(interest_set.interest_ids || EXCLUDED.interest_ids) ORDER BY 1
+)
+"""
+
+REMOVE_SQL = f"""
+UPDATE {TABLE}
+SET interest_ids = ARRAY(
+    SELECT unnest(interest_ids) EXCEPT SELECT unnest(%s::bigint[]) ORDER BY 1
+)
+WHERE user_id = %s
+"""
+
+PRUNE_SQL = f"""
+DELETE FROM {TABLE} interest_set
+WHERE NOT EXISTS (SELECT 1 FROM {USER_INTERESTS} WHERE user_id = interest_set.user_id)
+"""
+
+BACKFILL_SQL = f"""
+INSERT INTO {TABLE} AS interest_set (user_id, interest_ids)
+SELECT user_id, array_agg(interest_id ORDER BY interest_id)
+FROM {USER_INTERESTS}
+WHERE user_id >= %s AND user_id < %s
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET interest_ids = EXCLUDED.interest_ids
+"""
+
+
+def enabled() -> bool:
+    return settings.MATCHING_INTEREST_ARRAYS and connection.vendor == "postgresql"
+
+
+def add_interests(user_id: int, interest_ids: Iterable[int]) -> None:
+    interest_ids = sorted(interest_ids)
+    if interest_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(ADD_SQL, [user_id, interest_ids])
+
+
+def remove_user(user_id: int) -> None:
+    UserInterestSet.objects.filter(user_id=user_id).delete()
+
+
+def remove_interests(user_id: int, interest_ids: Iterable[int]) -> None:
+    interest_ids = sorted(interest_ids)
+    if interest_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(REMOVE_SQL, [interest_ids, user_id])
+
+
+class SharedInterestCount(Func):
+    """
+    Number of elements of the first array that are in the second one:
+    ``(SELECT COUNT(*) FROM unnest(a) AS shared_id WHERE shared_id = ANY(b))``.
+    Measured faster than an ``INTERSECT`` of both arrays.
+    """
+
+    template = "(SELECT COUNT(*) FROM unnest(%(expressions)s))"
+    arg_joiner = ") AS shared_id WHERE shared_id = ANY("
+    output_field = IntegerField()
+
+
+def matches_queryset(user_id: int) -> QuerySet[UserProfile]:
+    """
+    Profiles sharing an interest with ``user_id``, annotated with
+    ``shared_interests_count``: one GIN index scan for the ``&&`` overlap,
+    with the requester's own array read by a subquery of the same statement.
+    """
+    own = Subquery(UserInterestSet.objects.filter(user_id=user_id).values("interest_ids"))
+    return (
+        UserProfile.objects.with_public_data(shared_with=user_id)
+        .filter(user__interest_set__interest_ids__overlap=own)
+        .exclude(user_id=user_id)
+        .annotate(
+            shared_interests_count=SharedInterestCount(own, "user__interest_set__interest_ids")
+        )
+        .order_by("-shared_interests_count", "user__email")
+    )
+
+
+def backfill(batch_size: int = 5000) -> Iterator[int]:
+    """
+    Rewrite every array from ``UserInterest``, one range of user ids per
+    short transaction, and drop the arrays of users without interests.
+    Yields the number of arrays written so far.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(PRUNE_SQL)
+        cursor.execute(f"SELECT min(user_id), max(user_id) FROM {USER_INTERESTS}")
+        first, last = cursor.fetchone()
+    if first is None:
+        return
+    written = 0
+    for start in range(first, last + 1, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL, [start, start + batch_size])
+            written += cursor.rowcount
+        yield written
@@ -0,0 +1,166 @@
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.models import CustomUser, UserInterest
+from .models import MinHashBand
+
+# Hash functions are h(x) = (a * x + b) mod p. With p < 2**31 and interest
+# ids below 2**31 the products fit in int64.
+PRIME = 2**31 - 1
+# Fixed so that every process derives the same hash functions
+HASH_SEED = 20241018
+# Multiplier folding the rows of a band into one 64-bit bucket
+BUCKET_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+class MinHasher:
+    """MinHash signatures of interest sets, cut into ``bands`` of ``rows`` values."""
+
+    def __init__(self, bands: int, rows: int):
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(HASH_SEED)
+        count = bands * rows
+        self.a = rng.integers(1, PRIME, size=count, dtype=np.int64)
+        self.b = rng.integers(0, PRIME, size=count, dtype=np.int64)
+
+    def signatures(self, user_ids: np.ndarray, interest_ids: np.ndarray):
+        """
+        Signatures of many users from their ``(user_id, interest_id)`` rows.
+        Returns the sorted unique user ids and one signature row per user.
+        """
+        order = np.argsort(user_ids, kind="stable")
+        user_ids, interest_ids = user_ids[order], interest_ids[order]
+        users, starts = np.unique(user_ids, return_index=True)
+        hashed = (interest_ids[:, None] * self.a + self.b) % PRIME
+        return users, np.minimum.reduceat(hashed, starts, axis=0)
+
+    def buckets(self, signatures: np.ndarray) -> np.ndarray:
+        """Fold every band of the signatures into a bucket, one column per band."""
+        values = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        buckets = np.zeros(values.shape[:2], dtype=np.uint64)
+        for row in range(self.rows):
+            buckets = (buckets * BUCKET_MULTIPLIER) ^ values[:, :, row]
+        return buckets.view(np.int64)
+
+    def user_buckets(self, interest_ids: Sequence[int]) -> list[int]:
+        ids = np.asarray(interest_ids, dtype=np.int64)
+        _, signatures = self.signatures(np.zeros(len(ids), dtype=np.int64), ids)
+        return self.buckets(signatures)[0].tolist()
+
+
+def hasher() -> MinHasher:
+    return MinHasher(settings.MATCHING_LSH_BANDS, settings.MATCHING_LSH_ROWS)
+
+
+def refresh_user(user_id: int) -> None:
+    """Recompute the bands of ``user_id`` from their current interests."""
+    interest_ids = list(
+        UserInterest.objects.filter(user_id=user_id).values_list("interest_id", flat=True)
+    )
+    existing = {band.band: band for band in MinHashBand.objects.filter(user_id=user_id)}
+    buckets = hasher().user_buckets(interest_ids) if interest_ids else []
+    with transaction.atomic():
+        changed = []
+        created = []
+        for band, bucket in enumerate(buckets):
+            row = existing.pop(band, None)
+            if row is None:
+                created.append(MinHashBand(user_id=user_id, band=band, bucket=bucket))
+            elif row.bucket != bucket:
+                row.bucket = bucket
+                changed.append(row)
+        MinHashBand.objects.bulk_update(changed, ["bucket"])
+        MinHashBand.objects.bulk_create(created)
+        if existing:
+            MinHashBand.objects.filter(id__in=[row.id for row in existing.values()]).delete()
+
+
+def rebuild(batch_size: int = 10_000) -> Iterator[int]:
+    """
+    Recompute every user's bands in place, ``batch_size`` users per
+    transaction. Each batch upserts its users' bands and deletes their stale
+    ones (users without interests, bands beyond ``MATCHING_LSH_BANDS``) in
+    the same transaction, so approximate matching keeps its candidates while
+    the rebuild runs and bands written by ``refresh_user`` don't conflict
+    with it. Yields the number of users processed so far after every batch.
+    """
+    minhasher = hasher()
+    user_ids = list(CustomUser.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start : start + batch_size]
+        rows = np.array(
+            UserInterest.objects.filter(user_id__gte=batch[0], user_id__lte=batch[-1]).values_list(
+                "user_id", "interest_id"
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        users: list[int] = []
+        bands: list[MinHashBand] = []
+        if len(rows):
+            found, signatures = minhasher.signatures(rows[:, 0], rows[:, 1])
+            users = found.tolist()
+            bands = [
+                MinHashBand(user_id=user_id, band=band, bucket=bucket)
+                for user_id, user_buckets in zip(users, minhasher.buckets(signatures).tolist())
+                for band, bucket in enumerate(user_buckets)
+            ]
+        with transaction.atomic():
+            MinHashBand.objects.bulk_create(
+                bands,
+                batch_size=5000,
+                update_conflicts=True,
+                unique_fields=["user", "band"],
+                update_fields=["bucket"],
+            )
+            MinHashBand.objects.filter(user_id__gte=batch[0], user_id__lte=batch[-1]).filter(
+                ~Q(user_id__in=users) | Q(band__gte=minhasher.bands)
+            ).delete()
+        yield start + len(batch)
+
+
+def candidates(user_id: int, buckets: Iterable[int], limit: int) -> list[int]:
+    """Users colliding with ``buckets`` in any band, the most collisions first."""
+    collisions = Q()
+    for band, bucket in enumerate(buckets):
+        collisions |= Q(band=band, bucket=bucket)
+    if not collisions:
+        return []
+    return list(
+        MinHashBand.objects.filter(collisions)
+        .exclude(user_id=user_id)
+        .values("user_id")
+        .annotate(collisions=Count("id"))
+        .order_by("-collisions", "user_id")
+        .values_list("user_id", flat=True)[:limit]
+    )
+
+
+def rank_matches(user_id: int) -> list[tuple[int, int, str]]:
+    """
+    Approximate ``(user_id, shared_count, email)`` ranking, in the order of
+    the exact paths: only users colliding in some band are considered, and
+    their shared-interest counts are then computed exactly.
+    """
+    interest_ids = list(
+        UserInterest.objects.filter(user_id=user_id).values_list("interest_id", flat=True)
+    )
+    if not interest_ids:
+        return []
+    found = candidates(
+        user_id, hasher().user_buckets(interest_ids), settings.MATCHING_LSH_CANDIDATES
+    )
+    matches = list(
+        UserInterest.objects.filter(
+            user_id__in=found, interest_id__in=interest_ids, user__userprofile__isnull=False
+        )
+        .values("user_id", "user__email")
+        .annotate(shared=Count("id"))
+        .values_list("user_id", "shared", "user__email")
+    )
+    matches.sort(key=lambda match: (-match[1], match[2]))
+    return matches
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from matching import interest_sets
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite matching.UserInterestSet from UserInterest (PostgreSQL only), one range "
+        "of users per transaction so no table stays locked for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Range of user ids rewritten per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Interest arrays only exist on PostgreSQL.")
+        started = time.monotonic()
+        written = 0
+        for written in interest_sets.backfill(batch_size=options["batch_size"]):
+            self.stdout.write(f"{written} users written")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled interest arrays of {written} users in {time.monotonic() - started:.1f}s"
+            )
+        )
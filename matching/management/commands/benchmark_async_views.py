@@ -0,0 +1,86 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent throughput of the async (ASGI) read endpoints against their "
+        "sync (WSGI) versions, in process, against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight.")
+        parser.add_argument("--email", help="User to authenticate as (default: first profile).")
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.select_related("user").order_by("id")
+        if options["email"]:
+            profiles = profiles.filter(user__email=options["email"])
+        profile = profiles.first()
+        if profile is None:
+            raise CommandError("No user profile found; seed some data first.")
+        other = UserProfile.objects.exclude(id=profile.id).select_related("user").first() or profile
+        headers = {"Authorization": f"Bearer {RefreshToken.for_user(profile.user).access_token}"}
+
+        endpoints = [
+            ("public-profile", [other.user.public_id]),
+            ("common-interests", []),
+            ("interest_list", []),
+            ("interest-category-list", []),
+        ]
+        async_names = {
+            "public-profile": "public-profile-async",
+            "common-interests": "common-interests-async",
+            "interest_list": "interest_list_async",
+            "interest-category-list": "interest-category-list-async",
+        }
+        self.stdout.write(f"{'endpoint':<28}{'mode':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            for name, args in endpoints:
+                sync_url = reverse(name, args=args)
+                async_url = reverse(async_names[name], args=args)
+                self.report(name, "wsgi", self.run_sync(sync_url, headers, options))
+                self.report(name, "asgi", asyncio.run(self.run_async(async_url, headers, options)))
+
+    def run_sync(self, url, headers, options):
+        def request(_):
+            started = time.perf_counter()
+            Client().get(url, headers=headers)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            latencies = list(pool.map(request, range(options["requests"])))
+        return time.perf_counter() - started, latencies
+
+    async def run_async(self, url, headers, options):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def request():
+            async with semaphore:
+                started = time.perf_counter()
+                await client.get(url, headers=headers)
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(request() for _ in range(options["requests"])))
+        return time.perf_counter() - started, latencies
+
+    def report(self, name, mode, result):
+        elapsed, latencies = result
+        quantiles = statistics.quantiles(latencies, n=20)
+        self.stdout.write(
+            f"{name:<28}{mode:<7}{len(latencies) / elapsed:>10.1f}"
+            f"{statistics.median(latencies) * 1000:>10.1f}{quantiles[18] * 1000:>10.1f}"
+        )
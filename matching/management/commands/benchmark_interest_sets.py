@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import CustomUser
+from matching import interest_sets
+from matching.views import CommonInterestsUsersView
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the first page of common-interest matches computed by joining UserInterest "
+        "against the GIN-indexed interest arrays (PostgreSQL only), for a sample of users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=50, help="Users to rank matches for.")
+        parser.add_argument("--page-size", type=int, default=10)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Interest arrays only exist on PostgreSQL.")
+        users = list(
+            CustomUser.objects.filter(interest_set__isnull=False).order_by("?")[
+                : options["samples"]
+            ]
+        )
+        if not users:
+            raise CommandError("No interest arrays found; run backfill_interest_sets first.")
+
+        view = CommonInterestsUsersView()
+        timings: dict[str, list[float]] = {"join": [], "array": []}
+        mismatches = 0
+        for user in users:
+            pages = {}
+            for name, queryset in (
+                ("join", view.get_join_queryset(user)),
+                ("array", interest_sets.matches_queryset(user.id)),
+            ):
+                started = time.perf_counter()
+                pages[name] = list(
+                    queryset.values_list("user_id", "shared_interests_count")[
+                        : options["page_size"]
+                    ]
+                )
+                timings[name].append((time.perf_counter() - started) * 1000)
+            mismatches += pages["join"] != pages["array"]
+
+        self.stdout.write(f"{'query':<8}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, values in timings.items():
+            p95 = (
+                statistics.quantiles(values, n=20, method="inclusive")[18]
+                if len(values) > 1
+                else values[0]
+            )
+            self.stdout.write(f"{name:<8}{statistics.median(values):>10.2f}{p95:>10.2f}")
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f"{mismatches} users got different pages"))
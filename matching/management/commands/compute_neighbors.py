@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from matching import neighbors
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute every user's nearest neighbors by shared interests into "
+        "matching.UserNeighbors, from a sparse user × interest matrix."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-k", type=int, default=50, help="Number of neighbors kept for every user."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users whose neighbors are computed per matrix product.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes computing chunks; 1 computes them in this process.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = 0
+        for processed in neighbors.compute(
+            k=options["k"], chunk_size=options["chunk_size"], workers=options["workers"]
+        ):
+            self.stdout.write(f"{processed} users processed")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Computed neighbors of {processed} users in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import CustomUser
+from matching import lsh
+from matching.models import MinHashBand
+from matching.views import CommonInterestsUsersView
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure recall@k of the approximate MinHash LSH ranking against the exact "
+        "shared-interest ranking, and the latency of both, for a sample of users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=100, help="Users to rank matches for.")
+        parser.add_argument("-k", type=int, default=10, help="Size of the compared top lists.")
+
+    def handle(self, *args, **options):
+        k = options["k"]
+        users = list(
+            CustomUser.objects.filter(
+                userprofile__isnull=False, id__in=MinHashBand.objects.values("user_id")
+            ).order_by("?")[: options["samples"]]
+        )
+        if not users:
+            raise CommandError("No MinHash bands found; run rebuild_minhash_bands first.")
+
+        view = CommonInterestsUsersView()
+        recalls: list[float] = []
+        timings: dict[str, list[float]] = {"exact": [], "lsh": []}
+        for user in users:
+            started = time.perf_counter()
+            exact = list(
+                view.get_join_queryset(user).values_list("user_id", "shared_interests_count")[:k]
+            )
+            timings["exact"].append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            approximate = lsh.rank_matches(user.id)[:k]
+            timings["lsh"].append((time.perf_counter() - started) * 1000)
+            if not exact:
+                continue
+            # Users tied with the exact k-th match are as good as it, so they count as hits
+            threshold = exact[-1][1]
+            hits = sum(1 for _, shared, _ in approximate if shared >= threshold)
+            recalls.append(hits / len(exact))
+
+        if recalls:
+            self.stdout.write(
+                f"recall@{k}: mean {statistics.fmean(recalls):.3f}, "
+                f"min {min(recalls):.3f} over {len(recalls)} users"
+            )
+        for name, values in timings.items():
+            self.stdout.write(f"{name:<6} p50 {statistics.median(values):8.2f} ms")
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from matching import lsh
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's matching.MinHashBand rows from UserInterest in place. Needed "
+        "after switching MATCHING_LSH on or changing MATCHING_LSH_BANDS/ROWS. Approximate "
+        "matches stay available while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of users whose bands are written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = 0
+        for processed in lsh.rebuild(batch_size=options["batch_size"]):
+            self.stdout.write(f"{processed} users processed")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt MinHash bands for {processed} users in {time.monotonic() - started:.1f}s"
+            )
+        )
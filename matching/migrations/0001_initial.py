@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 11:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedInterestPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shared_count', models.PositiveIntegerField(default=0)),
+                ('weighted_score', models.FloatField(default=0)),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_pairs', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_pairs_with', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_a', '-shared_count'], name='matching_sh_user_a__663dd3_idx'), models.Index(fields=['user_a', '-weighted_score', '-shared_count'], name='matching_sh_user_a__74521f_idx')],
+                'unique_together': {('user_a', 'user_b')},
+            },
+        ),
+    ]
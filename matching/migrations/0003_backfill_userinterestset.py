@@ -0,0 +1,44 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 5000
+
+# Union with whatever the live sync already stored, so interests added while
+# the backfill runs aren't lost
+BACKFILL_SQL = """
+INSERT INTO matching_userinterestset AS interest_set (user_id, interest_ids)
+SELECT user_id, array_agg(interest_id ORDER BY interest_id)
+FROM core_userinterest
+WHERE user_id >= %s AND user_id < %s
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET interest_ids = ARRAY(
+    SELECT DISTINCT unnest(interest_set.interest_ids || EXCLUDED.interest_ids) ORDER BY 1
+)
+"""
+
+
+def backfill(apps, schema_editor):
+    """Fill the arrays one range of user ids at a time, each in its own short transaction."""
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT min(user_id), max(user_id) FROM core_userinterest")
+        first, last = cursor.fetchone()
+    if first is None:
+        return
+    for start in range(first, last + 1, BATCH_SIZE):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL, [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately instead of locking in one long transaction
+    atomic = False
+
+    dependencies = [
+        ("matching", "0002_userinterestset"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_auto_20241023_0014"),
+        ("matching", "0004_minhashband"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserNeighbors",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="neighbors",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("neighbor_ids", models.BinaryField()),
+                ("shared_counts", models.BinaryField()),
+                ("computed_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,3 +1,96 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from core.models import CustomUser
 
-# Create your models here.
+
+class SharedInterestPair(models.Model):
+    """
+    Denormalized shared-interest statistics of an ordered pair of users.
+
+    Every pair is stored in both directions so that a user's matches are one
+    range scan over ``user_a``. ``weighted_score`` sums ``user_a``'s importance
+    for the category of every shared interest.
+    """
+
+    user_a = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="interest_pairs")
+    user_b = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="interest_pairs_with"
+    )
+    shared_count = models.PositiveIntegerField(default=0)
+    weighted_score = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.user_a_id} - {self.user_b_id} ({self.shared_count})"
+
+    class Meta:
+        unique_together = ("user_a", "user_b")
+        indexes = [
+            models.Index(fields=["user_a", "-shared_count"]),
+            models.Index(fields=["user_a", "-weighted_score", "-shared_count"]),
+        ]
+
+
+class UserInterestSet(models.Model):
+    """
+    The ids of a user's interests as one sorted array, mirroring ``UserInterest``.
+
+    PostgreSQL only: the GIN index finds every user sharing an interest with
+    an ``&&`` overlap, so matches are ranked without joining ``UserInterest``.
+    The table isn't created on other databases, which is why deleting a user
+    doesn't cascade here; a signal removes the row instead.
+    """
+
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name="interest_set",
+    )
+    interest_ids = ArrayField(models.BigIntegerField(), default=list)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.interest_ids}"
+
+    class Meta:
+        indexes = [GinIndex(fields=["interest_ids"], name="matching_interest_ids_gin")]
+
+
+class MinHashBand(models.Model):
+    """
+    One locality-sensitive hashing band of a user's MinHash signature. Users
+    whose interest sets are similar are likely to share the ``bucket`` of at
+    least one band, so approximate matches are found with an index lookup on
+    ``(band, bucket)`` instead of counting shared interests with everyone.
+    """
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="minhash_bands")
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.user_id} band {self.band}: {self.bucket}"
+
+    class Meta:
+        unique_together = ("user", "band")
+        indexes = [models.Index(fields=["band", "bucket"])]
+
+
+class UserNeighbors(models.Model):
+    """
+    A user's precomputed nearest neighbors by shared interest count, as
+    written by the ``compute_neighbors`` batch job. Both lists are packed
+    little-endian arrays (user ids as int64, counts as int32) in ranking
+    order, so a user's whole list is one small row.
+    """
+
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, primary_key=True, related_name="neighbors"
+    )
+    neighbor_ids = models.BinaryField()
+    shared_counts = models.BinaryField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id}: {len(self.neighbor_ids) // 8} neighbors"
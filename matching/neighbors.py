@@ -0,0 +1,181 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, Optional
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from core.models import CustomUser, UserInterest, UserProfile
+from .models import UserNeighbors
+
+ID_DTYPE = np.dtype("<i8")
+COUNT_DTYPE = np.dtype("<i4")
+
+
+def pack(neighbor_ids: np.ndarray, shared_counts: np.ndarray) -> tuple[bytes, bytes]:
+    return neighbor_ids.astype(ID_DTYPE).tobytes(), shared_counts.astype(COUNT_DTYPE).tobytes()
+
+
+def unpack(neighbors: UserNeighbors) -> list[tuple[int, int]]:
+    """The ``(user_id, shared_count)`` list of a ``UserNeighbors`` row, best first."""
+    neighbor_ids = np.frombuffer(bytes(neighbors.neighbor_ids), dtype=ID_DTYPE)
+    shared_counts = np.frombuffer(bytes(neighbors.shared_counts), dtype=COUNT_DTYPE)
+    return list(zip(neighbor_ids.tolist(), shared_counts.tolist()))
+
+
+def _fetch_array(queryset, chunk_size: int) -> np.ndarray:
+    """Read a ``values_list`` queryset into an int64 array, ``chunk_size`` rows at a time."""
+    width = len(queryset.query.values_select)
+    rows = queryset.iterator(chunk_size=chunk_size)
+    parts = []
+    while chunk := list(islice(rows, chunk_size)):
+        parts.append(np.array(chunk, dtype=np.int64).reshape(-1, width))
+    return np.concatenate(parts) if parts else np.empty((0, width), dtype=np.int64)
+
+
+class InterestMatrix:
+    """
+    The users × interests incidence matrix in CSR form, with everything the
+    neighbor search needs indexed by matrix row:
+
+    - ``user_ids``: the user of every row; users without interests have no row
+    - ``candidates``: the rows of users with a profile, who can be suggested
+    - ``tiebreak``: every row's position in email order, the API's tie-break
+    """
+
+    def __init__(self, chunk_size: int = 100_000):
+        pairs = _fetch_array(
+            UserInterest.objects.order_by().values_list("user_id", "interest_id"), chunk_size
+        )
+        self.user_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        interest_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.int32), (rows, columns)),
+            shape=(len(self.user_ids), len(interest_ids)),
+        )
+        profiles = _fetch_array(UserProfile.objects.order_by().values_list("user_id"), chunk_size)
+        self.candidates = np.flatnonzero(np.isin(self.user_ids, profiles[:, 0]))
+        # Interests × candidate rows, the right-hand side of every chunk's product
+        self.candidate_columns = self.matrix[self.candidates].T.tocsr()
+        emails = CustomUser.objects.order_by("email").values_list("id")
+        by_email = _fetch_array(emails, chunk_size)[:, 0]
+        # Every user is in by_email; keep the positions of those that have a row
+        self.tiebreak = np.empty(len(self.user_ids), dtype=np.int64)
+        positions = np.searchsorted(self.user_ids, by_email)
+        found = positions < len(self.user_ids)
+        found[found] = self.user_ids[positions[found]] == by_email[found]
+        self.tiebreak[positions[found]] = np.flatnonzero(found)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def top_neighbors(self, start: int, stop: int, k: int):
+        """
+        The ``k`` best candidates of rows ``start`` to ``stop``: the most
+        shared interests first, then by email. Returns the flat arrays
+        ``(rows, neighbor rows, shared counts)``, sorted by row then rank.
+        """
+        # (stop - start) × candidates: only pairs sharing an interest are stored
+        shared = (self.matrix[start:stop] @ self.candidate_columns).tocsr()
+        rows = np.repeat(np.arange(start, stop), np.diff(shared.indptr))
+        neighbors = self.candidates[shared.indices]
+        counts = shared.data
+        others = neighbors != rows
+        rows, neighbors, counts = rows[others], neighbors[others], counts[others]
+
+        # Only entries at least as good as a row's k-th count can make its list;
+        # counts are small integers, so find that count with a histogram per row
+        local = rows - start
+        top = int(counts.max()) if len(counts) else 0
+        histogram = np.bincount(
+            local * (top + 1) + counts, minlength=(stop - start) * (top + 1)
+        ).reshape(stop - start, top + 1)
+        at_least = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1]
+        threshold = np.where(at_least >= k, np.arange(top + 1), 0).max(axis=1)
+        kept = counts >= threshold[local]
+        local, neighbors, counts = local[kept], neighbors[kept], counts[kept]
+
+        # One int64 sort key: row, then descending count, then email
+        key = (local * (top + 1) + (top - counts)) * len(self) + self.tiebreak[neighbors]
+        order = np.argsort(key, kind="stable")
+        local, neighbors, counts = local[order], neighbors[order], counts[order]
+        first = np.searchsorted(local, local, side="left")
+        best = np.arange(len(local)) - first < k
+        return local[best] + start, neighbors[best], counts[best]
+
+
+# Set in the parent before forking, so workers share it copy-on-write
+_matrix: Optional[InterestMatrix] = None
+
+
+def _top_neighbors(start: int, stop: int, k: int):
+    assert _matrix is not None
+    return _matrix.top_neighbors(start, stop, k)
+
+
+def _save(matrix: InterestMatrix, rows, neighbors, counts, computed_at) -> None:
+    """Upsert the lists found by ``InterestMatrix.top_neighbors`` for a chunk."""
+    users, starts = np.unique(rows, return_index=True)
+    lists = []
+    for row, ranked in zip(users, np.split(np.arange(len(rows)), starts[1:])):
+        neighbor_ids, shared_counts = pack(matrix.user_ids[neighbors[ranked]], counts[ranked])
+        lists.append(
+            UserNeighbors(
+                user_id=int(matrix.user_ids[row]),
+                neighbor_ids=neighbor_ids,
+                shared_counts=shared_counts,
+                computed_at=computed_at,
+            )
+        )
+    with transaction.atomic():
+        UserNeighbors.objects.bulk_create(
+            lists,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["neighbor_ids", "shared_counts", "computed_at"],
+        )
+
+
+def compute(k: int = 50, chunk_size: int = 1000, workers: int = 1) -> Iterator[int]:
+    """
+    Recompute every user's ``k`` nearest neighbors from ``UserInterest``.
+
+    The incidence matrix is loaded once, then ``chunk_size`` rows at a time
+    are multiplied with the candidates' columns, which bounds the memory of
+    the product. With several ``workers`` the chunks are spread over forked
+    processes; only the parent reads or writes the database. Lists of users
+    that no longer have interests are deleted at the end. Yields the number
+    of users processed so far after every chunk.
+    """
+    global _matrix
+    computed_at = timezone.now()
+    _matrix = matrix = InterestMatrix()
+    chunks = [
+        (start, min(start + chunk_size, len(matrix))) for start in range(0, len(matrix), chunk_size)
+    ]
+    try:
+        if workers > 1:
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(workers, mp_context=context) as executor:
+                # Keep a few chunks in flight so finished results don't pile up
+                pending: deque = deque()
+                for start, stop in chunks:
+                    pending.append((stop, executor.submit(_top_neighbors, start, stop, k)))
+                    if len(pending) >= 2 * workers:
+                        stop, future = pending.popleft()
+                        _save(matrix, *future.result(), computed_at)
+                        yield stop
+                for stop, future in pending:
+                    _save(matrix, *future.result(), computed_at)
+                    yield stop
+        else:
+            for start, stop in chunks:
+                _save(matrix, *matrix.top_neighbors(start, stop, k), computed_at)
+                yield stop
+    finally:
+        _matrix = None
+    UserNeighbors.objects.filter(computed_at__lt=computed_at).delete()
@@ -0,0 +1,183 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from bisect import bisect_right
+from functools import reduce
+from typing import Any, Callable, Optional, Sequence
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite sort key.
+
+    The cursor is an opaque encoding of the sort key of the last row on the
+    page, and the next page is selected with a row comparison against it, so
+    no ``COUNT(*)`` or ``OFFSET`` query is ever needed. The ordering must be
+    total, i.e. end with a unique field.
+    """
+
+    ordering: Sequence[str] = ("id",)
+    # The JSON types a cursor may hold for each ordering field
+    cursor_types: Sequence[tuple] = ((int,),)
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        rows = list(self._page_queryset(queryset, request))
+        return self._finish_page(rows, self.instance_key)
+
+    async def apaginate_queryset(self, queryset: QuerySet, request):
+        rows = [row async for row in self._page_queryset(queryset, request)]
+        return self._finish_page(rows, self.instance_key)
+
+    def _page_queryset(self, queryset: QuerySet, request) -> QuerySet:
+        """The rows of the requested page, plus one to tell whether there is a next page."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        after = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if after is not None:
+            queryset = queryset.filter(self.keyset_filter(after))
+        return queryset[: self.page_size + 1]
+
+    def paginate_ranked(
+        self,
+        ranked: Sequence,
+        request,
+        key: Callable[[Any], Sequence],
+        keep: Optional[Callable[[Sequence], list]] = None,
+    ):
+        """
+        Paginate an already sorted sequence. ``key`` returns the values of the
+        ordering fields for an item, in the same shape as ``instance_key``.
+        ``keep`` filters a slice of items, keeping their order: it is called
+        on growing windows past the cursor until the page is full, so only
+        the items near the page are checked.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        after = self.decode_cursor(request)
+
+        start = 0
+        if after is not None:
+            try:
+                position = self.comparable(after)
+                start = bisect_right(ranked, position, key=lambda item: self.comparable(key(item)))
+            except TypeError:
+                raise NotFound(self.invalid_cursor_message)
+        if keep is None:
+            return self._finish_page(list(ranked[start : start + self.page_size + 1]), key)
+
+        rows: list = []
+        window = self.page_size + 1
+        while len(rows) <= self.page_size and start < len(ranked):
+            rows.extend(keep(ranked[start : start + window]))
+            start += window
+            window *= 4
+        return self._finish_page(rows[: self.page_size + 1], key)
+
+    def _finish_page(self, rows: list, key: Callable[[Any], Sequence]) -> list:
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.next_key = list(key(rows[-1])) if self.has_next else None
+        return rows
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(self.query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def query_params(request):
+        # DRF requests have query_params, plain Django ones (async views) GET
+        return getattr(request, "query_params", request.GET)
+
+    def instance_key(self, instance) -> list:
+        return [reduce(getattr, field.lstrip("-").split("__"), instance) for field in self.ordering]
+
+    def comparable(self, values: Sequence) -> tuple:
+        """Turn ordering values into a tuple that sorts ascending in page order."""
+        return tuple(
+            -value if field.startswith("-") else value
+            for field, value in zip(self.ordering, values)
+        )
+
+    def keyset_filter(self, after: Sequence) -> Q:
+        """Rows strictly after ``after``: (a, b) > (x, y) as a | (a == x & b > y)."""
+        condition: Optional[Q] = None
+        for field, value in reversed(list(zip(self.ordering, after))):
+            name = field.lstrip("-")
+            beyond = Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+            condition = beyond if condition is None else beyond | (Q(**{name: value}) & condition)
+        assert condition is not None
+        return condition
+
+    def encode_cursor(self, values: Sequence) -> str:
+        return urlsafe_b64encode(json.dumps(list(values), separators=(",", ":")).encode()).decode()
+
+    def decode_cursor(self, request) -> Optional[list]:
+        encoded = self.query_params(request).get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        for value, types in zip(values, self.cursor_types):
+            # bool is an int subclass but never a valid key
+            if isinstance(value, bool) or not isinstance(value, types):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_key))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class CommonInterestsPagination(KeysetPagination):
+    ordering = ("-shared_interests_count", "user__email")
+    cursor_types = ((int,), (str,))
+
+
+class WeightedCommonInterestsPagination(KeysetPagination):
+    ordering = ("-score", "-shared_interests_count", "user__email")
+    cursor_types = ((int, float), (int,), (str,))
+
+
+class ProfilePagination(KeysetPagination):
+    ordering = ("id",)
+    cursor_types = ((int,),)
+
+
+class NeighborPagination(KeysetPagination):
+    ordering = ("rank",)
+    cursor_types = ((int,),)
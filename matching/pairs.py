@@ -0,0 +1,176 @@
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.models import CustomUser, Interest, UserInterest, UserInterestCategoryImportance
+from .models import SharedInterestPair
+from .scoring import DEFAULT_IMPORTANCE
+
+
+def _importance(user_ref, category_id: int):
+    """The importance of ``category_id`` for ``user_ref``, defaulting like the scorer."""
+    return Coalesce(
+        Subquery(
+            UserInterestCategoryImportance.objects.filter(
+                user=user_ref, category_id=category_id
+            ).values("importance")[:1]
+        ),
+        Value(DEFAULT_IMPORTANCE),
+    )
+
+
+def _importances(user_ids: Iterable[int], category_id: int) -> dict[int, int]:
+    return dict(
+        UserInterestCategoryImportance.objects.filter(
+            user_id__in=user_ids, category_id=category_id
+        ).values_list("user_id", "importance")
+    )
+
+
+def _shift_pairs(user_id: int, interest_id: int, step: int) -> None:
+    """Add (``step=1``) or remove (``step=-1``) one shared interest to every pair it affects."""
+    category_id = (
+        Interest.objects.filter(id=interest_id).values_list("category_id", flat=True).first()
+    )
+    if category_id is None:
+        # The interest itself is being deleted; run the rebuild command afterwards
+        return
+    holders = list(
+        UserInterest.objects.filter(interest_id=interest_id)
+        .exclude(user_id=user_id)
+        .values_list("user_id", flat=True)
+    )
+    if not holders:
+        return
+
+    own_weight = _importances([user_id], category_id).get(user_id, DEFAULT_IMPORTANCE)
+    SharedInterestPair.objects.filter(user_a_id=user_id, user_b_id__in=holders).update(
+        shared_count=F("shared_count") + step,
+        weighted_score=F("weighted_score") + step * own_weight,
+    )
+    SharedInterestPair.objects.filter(user_b_id=user_id, user_a_id__in=holders).update(
+        shared_count=F("shared_count") + step,
+        weighted_score=F("weighted_score") + step * _importance(OuterRef("user_a"), category_id),
+    )
+
+    if step < 0:
+        SharedInterestPair.objects.filter(user_a_id=user_id, shared_count=0).delete()
+        SharedInterestPair.objects.filter(user_b_id=user_id, shared_count=0).delete()
+        return
+
+    paired = set(
+        SharedInterestPair.objects.filter(user_a_id=user_id, user_b_id__in=holders).values_list(
+            "user_b_id", flat=True
+        )
+    )
+    new_partners = [holder for holder in holders if holder not in paired]
+    weights = _importances(new_partners, category_id)
+    new_pairs = []
+    for partner in new_partners:
+        new_pairs.append(
+            SharedInterestPair(
+                user_a_id=user_id, user_b_id=partner, shared_count=1, weighted_score=own_weight
+            )
+        )
+        new_pairs.append(
+            SharedInterestPair(
+                user_a_id=partner,
+                user_b_id=user_id,
+                shared_count=1,
+                weighted_score=weights.get(partner, DEFAULT_IMPORTANCE),
+            )
+        )
+    SharedInterestPair.objects.bulk_create(new_pairs, ignore_conflicts=True)
+
+
+def add_interests(user_id: int, interest_ids: Iterable[int]) -> None:
+    """Account for ``user_id`` having gained ``interest_ids``; their rows must already exist."""
+    with transaction.atomic():
+        for interest_id in interest_ids:
+            _shift_pairs(user_id, interest_id, 1)
+
+
+def remove_interests(user_id: int, interest_ids: Iterable[int]) -> None:
+    """Account for ``user_id`` having lost ``interest_ids``; their rows must be gone already."""
+    with transaction.atomic():
+        for interest_id in interest_ids:
+            _shift_pairs(user_id, interest_id, -1)
+
+
+def refresh_weighted_scores(user_id: int) -> None:
+    """Recompute ``weighted_score`` of every pair ``user_id`` ranks, after an importance change."""
+    weights = dict(
+        UserInterestCategoryImportance.objects.filter(user_id=user_id).values_list(
+            "category_id", "importance"
+        )
+    )
+    shared = (
+        UserInterest.objects.filter(interest__userinterest__user_id=user_id)
+        .exclude(user_id=user_id)
+        .values("user_id", "interest__category_id")
+        .annotate(shared=Count("id"))
+        .values_list("user_id", "interest__category_id", "shared")
+    )
+    scores: dict[int, float] = {}
+    for partner, category_id, count in shared:
+        scores[partner] = scores.get(partner, 0) + count * weights.get(
+            category_id, DEFAULT_IMPORTANCE
+        )
+    pairs = list(SharedInterestPair.objects.filter(user_a_id=user_id))
+    for pair in pairs:
+        pair.weighted_score = scores.get(pair.user_b_id, 0)
+    SharedInterestPair.objects.bulk_update(pairs, ["weighted_score"], batch_size=1000)
+
+
+REBUILD_SQL = """
+INSERT INTO {pairs} (user_a_id, user_b_id, shared_count, weighted_score)
+SELECT a.user_id, b.user_id, COUNT(*), SUM(COALESCE(importance.importance, %s))
+FROM {user_interests} a
+JOIN {user_interests} b ON b.interest_id = a.interest_id AND b.user_id <> a.user_id
+JOIN {interests} interest ON interest.id = a.interest_id
+LEFT JOIN {importances} importance
+    ON importance.user_id = a.user_id AND importance.category_id = interest.category_id
+WHERE a.user_id >= %s AND a.user_id < %s
+GROUP BY a.user_id, b.user_id
+ON CONFLICT (user_a_id, user_b_id) DO UPDATE
+SET shared_count = excluded.shared_count, weighted_score = excluded.weighted_score
+"""
+
+# Pairs of the batch whose users no longer share any interest
+PRUNE_SQL = """
+DELETE FROM {pairs}
+WHERE user_a_id >= %s AND user_a_id < %s AND NOT EXISTS (
+    SELECT 1
+    FROM {user_interests} a
+    JOIN {user_interests} b ON b.interest_id = a.interest_id
+    WHERE a.user_id = {pairs}.user_a_id AND b.user_id = {pairs}.user_b_id
+)
+"""
+
+
+def rebuild(batch_size: int = 1000) -> Iterable[int]:
+    """
+    Recompute the whole table from ``UserInterest``, ``batch_size`` users per
+    transaction so no single transaction gets too large. Each batch upserts
+    its users' pairs and deletes their stale ones in the same transaction, so
+    the table stays complete while the rebuild runs and pairs written by
+    concurrent interest changes don't conflict with it. Yields the number of
+    users processed so far after every batch.
+    """
+    tables = dict(
+        pairs=SharedInterestPair._meta.db_table,
+        user_interests=UserInterest._meta.db_table,
+        interests=Interest._meta.db_table,
+        importances=UserInterestCategoryImportance._meta.db_table,
+    )
+    upsert, prune = REBUILD_SQL.format(**tables), PRUNE_SQL.format(**tables)
+    user_ids = list(CustomUser.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start : start + batch_size]
+        bounds = [batch[0], batch[-1] + 1]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(upsert, [DEFAULT_IMPORTANCE, *bounds])
+            cursor.execute(prune, bounds)
+        yield start + len(batch)
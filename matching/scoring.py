@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from django.db.models import Count
+
+from core.authentication import AuthenticatedUser
+from core.models import Interest, UserInterest, UserInterestCategoryImportance
+from .index import InterestIndex
+
+# Ranking modes of users/common-interests/: plain shared-interest count, or
+# every shared interest weighted by the requester's importance for its category
+SCORING_SHARED = "shared"
+SCORING_WEIGHTED = "weighted"
+SCORINGS = (SCORING_SHARED, SCORING_WEIGHTED)
+
+# Weight of a category the requesting user hasn't rated: the middle of the 1-5
+# scale, so an unrated profile ranks exactly like the plain shared count.
+DEFAULT_IMPORTANCE = 3
+
+
+@dataclass
+class SharedCategoryMatrix:
+    """Shared-interest counts of candidate users, broken down per category."""
+
+    user_ids: np.ndarray
+    category_ids: np.ndarray
+    counts: np.ndarray
+    emails: list[str]
+
+    @property
+    def shared_counts(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+
+def build_matrix(
+    rows: Iterable[tuple[int, int, int]], emails: dict[int, str]
+) -> SharedCategoryMatrix:
+    """Build the user x category matrix from ``(user_id, category_id, count)`` rows."""
+    data = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+    user_ids, user_rows = np.unique(data[:, 0], return_inverse=True)
+    category_ids, category_columns = np.unique(data[:, 1], return_inverse=True)
+    counts = np.zeros((len(user_ids), len(category_ids)), dtype=np.int32)
+    np.add.at(counts, (user_rows, category_columns), data[:, 2])
+    return SharedCategoryMatrix(
+        user_ids=user_ids,
+        category_ids=category_ids,
+        counts=counts,
+        emails=[emails[user_id] for user_id in user_ids.tolist()],
+    )
+
+
+def matrix_from_database(user: AuthenticatedUser) -> SharedCategoryMatrix:
+    rows = list(
+        UserInterest.objects.filter(
+            interest__in=Interest.objects.filter(userinterest__user_id=user.id),
+            user__userprofile__isnull=False,
+        )
+        .exclude(user_id=user.id)
+        .values("user_id", "user__email", "interest__category_id")
+        .annotate(shared=Count("id"))
+        .values_list("user_id", "user__email", "interest__category_id", "shared")
+    )
+    emails = {user_id: email for user_id, email, _, _ in rows}
+    return build_matrix(((u, c, n) for u, _, c, n in rows), emails)
+
+
+def matrix_from_index(user: AuthenticatedUser, index: InterestIndex) -> SharedCategoryMatrix:
+    postings = index.postings_for(user.id)
+    categories = dict(Interest.objects.filter(id__in=postings).values_list("id", "category_id"))
+    if not postings:
+        return build_matrix((), {})
+    candidates = np.concatenate(
+        [np.frombuffer(posting, dtype=np.int64) for posting in postings.values()]
+    )
+    category_per_candidate = np.repeat(
+        np.array([categories[interest_id] for interest_id in postings], dtype=np.int64),
+        [len(posting) for posting in postings.values()],
+    )
+    emails = index.emails_for(np.unique(candidates).tolist())
+    keep = np.isin(candidates, np.fromiter(emails, dtype=np.int64, count=len(emails)))
+    keep &= candidates != user.id
+    rows = np.column_stack(
+        [candidates[keep], category_per_candidate[keep], np.ones(keep.sum(), dtype=np.int64)]
+    )
+    return build_matrix(rows, emails)
+
+
+def category_weights(user: AuthenticatedUser, category_ids: np.ndarray) -> np.ndarray:
+    """Importance of each category for ``user``, in the matrix column order."""
+    importances = dict(
+        UserInterestCategoryImportance.objects.filter(
+            user_id=user.id, category_id__in=category_ids.tolist()
+        ).values_list("category_id", "importance")
+    )
+    weights = [importances.get(category_id, DEFAULT_IMPORTANCE) for category_id in category_ids]
+    return np.array(weights, dtype=np.float64)
+
+
+def rank_weighted_matches(
+    user: AuthenticatedUser, index: Optional[InterestIndex] = None
+) -> list[tuple[int, float, int, str]]:
+    """
+    Return ``(user_id, score, shared_count, email)`` tuples where every shared
+    interest counts as much as ``user``'s importance for its category. Ordered
+    by score, then shared count, both descending, then email.
+    """
+    matrix = matrix_from_index(user, index) if index is not None else matrix_from_database(user)
+    if not len(matrix.user_ids):
+        return []
+    scores = matrix.counts @ category_weights(user, matrix.category_ids)
+    shared_counts = matrix.shared_counts
+    emails = np.array(matrix.emails)
+    order = np.lexsort((emails, -shared_counts, -scores))
+    return list(
+        zip(
+            matrix.user_ids[order].tolist(),
+            scores[order].tolist(),
+            shared_counts[order].tolist(),
+            emails[order].tolist(),
+        )
+    )
@@ -1,6 +1,10 @@
-from datetime import date
+from typing import Any, Iterable, Optional
 from rest_framework import serializers
-from core.models import UserProfile, UserInterest
+from core.models import UserProfile, UserInterest, shared_interest
+
+# The values public_profile_data() builds the profiles from; "age" is the
+# UserProfileQuerySet.with_age() annotation
+PUBLIC_PROFILE_FIELDS = ("user_id", "user__public_id", "bio", "age")
 
 
 class PublicUserInterestSerializer(serializers.ModelSerializer):
@@ -15,7 +19,8 @@ class PublicUserInterestSerializer(serializers.ModelSerializer):
 
 class PublicProfileSerializer(serializers.ModelSerializer):
     public_id = serializers.UUIDField(source="user.public_id", read_only=True)
-    age = serializers.SerializerMethodField()
+    # Annotated in SQL by UserProfileQuerySet.with_public_data()
+    age = serializers.IntegerField(read_only=True)
     interests = PublicUserInterestSerializer(
         source="user.user_interests", many=True, read_only=True
     )
@@ -25,12 +30,74 @@ class PublicProfileSerializer(serializers.ModelSerializer):
         fields = ("public_id", "bio", "age", "interests")
         read_only_fields = fields
 
-    def get_age(self, obj):
-        if obj.birth_date:
-            today = date.today()
-            return (
-                today.year
-                - obj.birth_date.year
-                - ((today.month, today.day) < (obj.birth_date.month, obj.birth_date.day))
+
+def public_profile_data(
+    rows: Iterable[tuple], shared_with: Optional[int] = None
+) -> dict[int, dict[str, Any]]:
+    """
+    What ``PublicProfileSerializer`` outputs for every profile, keyed by user
+    id in the order of ``rows``, which are ``PUBLIC_PROFILE_FIELDS`` values.
+    The interests of all of them are read with one ``.values_list()`` query,
+    and no model instance or serializer field is involved. With
+    ``shared_with``, the output is ``MatchSerializer``'s, whose shared
+    interests are found by the same query.
+    """
+    profiles: dict[int, dict[str, Any]] = {}
+    for user_id, public_id, bio, age in rows:
+        profiles[user_id] = {"public_id": str(public_id), "bio": bio, "age": age, "interests": []}
+        if shared_with is not None:
+            profiles[user_id]["shared_interests"] = []
+    if profiles:
+        interests = UserInterest.objects.filter(user_id__in=profiles).order_by("id")
+        fields = ["user_id", "interest_id", "interest__name", "interest__category__name"]
+        if shared_with is not None:
+            interests = interests.annotate(is_shared=shared_interest(shared_with))
+            fields.append("is_shared")
+        for user_id, interest_id, interest_name, category_name, *shared in interests.values_list(
+            *fields
+        ):
+            profile = profiles[user_id]
+            profile["interests"].append(
+                {"interest_name": interest_name, "category_name": category_name}
             )
-        return None
+            if shared and shared[0]:
+                profile["shared_interests"].append({"id": interest_id, "name": interest_name})
+    return profiles
+
+
+class MatchSerializer(PublicProfileSerializer):
+    """
+    Public profile of a match, with the interests the requester has too. The
+    interests must come from ``with_public_data(shared_with=requester_id)``.
+    """
+
+    shared_interests = serializers.SerializerMethodField()
+
+    class Meta(PublicProfileSerializer.Meta):
+        fields = PublicProfileSerializer.Meta.fields + ("shared_interests",)
+        read_only_fields = fields
+
+    def get_shared_interests(self, obj) -> list[dict[str, Any]]:
+        return [
+            {"id": user_interest.interest_id, "name": user_interest.interest.name}
+            for user_interest in obj.user.user_interests.all()
+            if user_interest.is_shared
+        ]
+
+
+class PublicProfileBatchSerializer(serializers.Serializer):
+    MAX_PUBLIC_IDS = 300
+
+    public_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=MAX_PUBLIC_IDS
+    )
+
+
+class AgeRangeSerializer(serializers.Serializer):
+    min_age = serializers.IntegerField(min_value=0, max_value=150, required=False)
+    max_age = serializers.IntegerField(min_value=0, max_value=150, required=False)
+
+    def validate(self, attrs):
+        if attrs.get("min_age", 0) > attrs.get("max_age", 150):
+            raise serializers.ValidationError("min_age can't be greater than max_age.")
+        return attrs
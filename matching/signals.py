@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import CustomUser, UserInterest, UserInterestCategoryImportance, UserProfile
+from core.signals import category_importances_changed, user_interests_changed
+from . import interest_sets, lsh, pairs
+from .cache import match_cache
+from .index import interest_index
+
+
+@receiver(post_save, sender=UserInterest)
+def index_user_interest_saved(sender, instance: UserInterest, created: bool, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: interest_index.add_interests(instance.user_id, [instance.interest_id])
+        )
+
+
+@receiver(post_delete, sender=UserInterest)
+def index_user_interest_deleted(sender, instance: UserInterest, **kwargs):
+    transaction.on_commit(
+        lambda: interest_index.remove_interests(instance.user_id, [instance.interest_id])
+    )
+
+
+@receiver(user_interests_changed)
+def index_user_interests_changed(sender, user_id: int, added, removed, **kwargs):
+    def apply():
+        interest_index.remove_interests(user_id, removed)
+        interest_index.add_interests(user_id, added)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_user_profile_saved(sender, instance: UserProfile, created: bool, **kwargs):
+    if created:
+        email = instance.user.email
+        transaction.on_commit(lambda: interest_index.set_profile(instance.user_id, email))
+
+
+@receiver(post_delete, sender=UserProfile)
+def index_user_profile_deleted(sender, instance: UserProfile, **kwargs):
+    transaction.on_commit(lambda: interest_index.remove_profile(instance.user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+def index_user_saved(sender, instance: CustomUser, **kwargs):
+    transaction.on_commit(lambda: interest_index.update_email(instance.id, instance.email))
+
+
+@receiver(post_save, sender=UserInterest)
+def pairs_user_interest_saved(sender, instance: UserInterest, created: bool, **kwargs):
+    if created and settings.MATCHING_SHARED_INTEREST_PAIRS:
+        pairs.add_interests(instance.user_id, [instance.interest_id])
+
+
+@receiver(post_delete, sender=UserInterest)
+def pairs_user_interest_deleted(sender, instance: UserInterest, **kwargs):
+    if settings.MATCHING_SHARED_INTEREST_PAIRS:
+        pairs.remove_interests(instance.user_id, [instance.interest_id])
+
+
+@receiver(user_interests_changed)
+def pairs_user_interests_changed(sender, user_id: int, added, removed, **kwargs):
+    if settings.MATCHING_SHARED_INTEREST_PAIRS:
+        pairs.remove_interests(user_id, removed)
+        pairs.add_interests(user_id, added)
+
+
+@receiver(post_save, sender=UserInterestCategoryImportance)
+@receiver(post_delete, sender=UserInterestCategoryImportance)
+def pairs_importance_changed(sender, instance: UserInterestCategoryImportance, **kwargs):
+    if settings.MATCHING_SHARED_INTEREST_PAIRS:
+        pairs.refresh_weighted_scores(instance.user_id)
+
+
+@receiver(category_importances_changed)
+def pairs_importances_changed(sender, user_id: int, **kwargs):
+    if settings.MATCHING_SHARED_INTEREST_PAIRS:
+        pairs.refresh_weighted_scores(user_id)
+
+
+@receiver(post_save, sender=UserInterest)
+def interest_set_user_interest_saved(sender, instance: UserInterest, created: bool, **kwargs):
+    if created and interest_sets.enabled():
+        interest_sets.add_interests(instance.user_id, [instance.interest_id])
+
+
+@receiver(post_delete, sender=UserInterest)
+def interest_set_user_interest_deleted(sender, instance: UserInterest, **kwargs):
+    if interest_sets.enabled():
+        interest_sets.remove_interests(instance.user_id, [instance.interest_id])
+
+
+@receiver(user_interests_changed)
+def interest_set_user_interests_changed(sender, user_id: int, added, removed, **kwargs):
+    if interest_sets.enabled():
+        interest_sets.remove_interests(user_id, removed)
+        interest_sets.add_interests(user_id, added)
+
+
+@receiver(post_save, sender=UserInterest)
+def minhash_user_interest_saved(sender, instance: UserInterest, created: bool, **kwargs):
+    if created and settings.MATCHING_LSH:
+        lsh.refresh_user(instance.user_id)
+
+
+@receiver(post_delete, sender=UserInterest)
+def minhash_user_interest_deleted(sender, instance: UserInterest, **kwargs):
+    if settings.MATCHING_LSH:
+        lsh.refresh_user(instance.user_id)
+
+
+@receiver(user_interests_changed)
+def minhash_user_interests_changed(sender, user_id: int, **kwargs):
+    if settings.MATCHING_LSH:
+        lsh.refresh_user(user_id)
+
+
+@receiver(post_delete, sender=CustomUser)
+def interest_set_user_deleted(sender, instance: CustomUser, **kwargs):
+    if interest_sets.enabled():
+        interest_sets.remove_user(instance.id)
+
+
+@receiver(post_save, sender=UserInterest)
+@receiver(post_delete, sender=UserInterest)
+@receiver(post_save, sender=UserInterestCategoryImportance)
+@receiver(post_delete, sender=UserInterestCategoryImportance)
+def invalidate_match_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: match_cache.invalidate(instance.user_id))
+
+
+@receiver(user_interests_changed)
+@receiver(category_importances_changed)
+def invalidate_match_cache_after_bulk_change(sender, user_id: int, **kwargs):
+    transaction.on_commit(lambda: match_cache.invalidate(user_id))
@@ -1,12 +1,49 @@
-from unittest.mock import Mock
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from uuid import UUID, uuid4
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request as DRFRequest
 from rest_framework.test import APIClient
-from core.models import CustomUser, Interest, InterestCategory, UserInterest, UserProfile
-from .views import CommonInterestsUsersView
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import (
+    CustomUser,
+    Interest,
+    InterestCategory,
+    UserInterest,
+    UserInterestCategoryImportance,
+    UserProfile,
+    years_before,
+)
+from . import lsh, neighbors, pairs
+from .cache import decode_ranking, encode_ranking, match_cache
+from .index import interest_index
+from .models import MinHashBand, SharedInterestPair, UserInterestSet, UserNeighbors
+from .pagination import KeysetPagination
+from .scoring import rank_weighted_matches
+from .serializers import (
+    PUBLIC_PROFILE_FIELDS,
+    MatchSerializer,
+    PublicProfileSerializer,
+    public_profile_data,
+)
+from .views import CommonInterestsUsersView, PublicProfileExportView
 
 
-class CommonInterestsUsersViewTests(TestCase):
+class MatchingTestCase(TestCase):
+    client_class = APIClient
+
     # Constants for categories
     CATEGORY_SPORTS = "Sports"
     CATEGORY_MUSIC = "Music"
@@ -78,6 +115,8 @@ class CommonInterestsUsersViewTests(TestCase):
             for interest in interests:
                 UserInterest.objects.create(user=cls.users[user], interest=cls.interests[interest])
 
+
+class CommonInterestsUsersViewTests(MatchingTestCase):
     def setUp(self):
         self.view = CommonInterestsUsersView()
         self.mock_request = Mock(spec=DRFRequest)
@@ -107,3 +146,899 @@ class CommonInterestsUsersViewTests(TestCase):
             profile.user.email for profile in users if profile.user.email == self.USER1_EMAIL
         ]
         self.assertEqual(len(user1_emails), 0)
+
+
+class InterestIndexTests(MatchingTestCase):
+    def setUp(self):
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        self.client.force_authenticate(self.users["user1"])
+
+    def matched_emails(self, user):
+        return [(email, count) for _, count, email in interest_index.top_matches(user.id)]
+
+    def test_top_matches_order(self):
+        """Test the index ranks by shared count, then email, like the SQL path"""
+        self.assertEqual(
+            interest_index.top_matches(self.users["user1"].id),
+            [
+                (self.users["user2"].id, 2, self.USER2_EMAIL),
+                (self.users["user3"].id, 1, self.USER3_EMAIL),
+            ],
+        )
+
+    def test_tracks_interest_writes(self):
+        """Test the index follows single-row and bulk interest changes after commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            UserInterest.objects.create(
+                user=self.users["user4"], interest=self.interests[self.INTEREST_FOOTBALL]
+            )
+        self.assertEqual(
+            self.matched_emails(self.users["user1"]),
+            [(self.USER2_EMAIL, 2), (self.USER3_EMAIL, 1), (self.USER4_EMAIL, 1)],
+        )
+
+        self.client.force_authenticate(self.users["user3"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("user_interests_bulk_update"),
+                {"interest_ids": [self.interests[self.INTEREST_JAZZ].id]},
+                format="json",
+            )
+        self.assertEqual(
+            self.matched_emails(self.users["user1"]),
+            [(self.USER2_EMAIL, 2), (self.USER4_EMAIL, 1)],
+        )
+
+    @override_settings(MATCHING_INTEREST_INDEX=True)
+    def test_endpoint_matches_sql_path(self):
+        """Test the endpoint returns the same profiles from the index and from SQL"""
+        from_index = self.client.get(reverse("common-interests")).json()["results"]
+        interest_index.clear()
+        with override_settings(MATCHING_INTEREST_INDEX=False):
+            from_sql = self.client.get(reverse("common-interests")).json()["results"]
+        self.assertEqual(from_index, from_sql)
+        self.assertEqual(len(from_index), 2)
+
+
+class WeightedScoringTests(MatchingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        user1 = cls.users["user1"]
+        UserInterest.objects.create(user=user1, interest=cls.interests[cls.INTEREST_JAZZ])
+        UserInterestCategoryImportance.objects.create(
+            user=user1, category=cls.categories[cls.CATEGORY_SPORTS], importance=1
+        )
+        UserInterestCategoryImportance.objects.create(
+            user=user1, category=cls.categories[cls.CATEGORY_MUSIC], importance=5
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+
+    def ranked_emails(self, ranked):
+        return [(email, score) for _, score, _, email in ranked]
+
+    def test_weights_shared_interests_by_category_importance(self):
+        """Test each shared interest counts as the requester's importance for its category"""
+        expected = [(self.USER4_EMAIL, 5.0), (self.USER2_EMAIL, 2.0), (self.USER3_EMAIL, 1.0)]
+        self.assertEqual(self.ranked_emails(rank_weighted_matches(self.users["user1"])), expected)
+
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        ranked = rank_weighted_matches(self.users["user1"], interest_index)
+        self.assertEqual(self.ranked_emails(ranked), expected)
+
+    def test_unrated_categories_use_default_importance(self):
+        """Test a user without importances ranks like the plain shared count"""
+        ranked = self.ranked_emails(rank_weighted_matches(self.users["user2"]))
+        self.assertEqual(
+            [email for email, _ in ranked], [self.USER1_EMAIL, self.USER3_EMAIL, self.USER4_EMAIL]
+        )
+
+    def test_endpoint_scoring_parameter(self):
+        """Test ?scoring=weighted reorders the endpoint and unknown modes are rejected"""
+        url = reverse("common-interests")
+        weighted = self.client.get(url, {"scoring": "weighted"}).json()["results"]
+        emails = dict(CustomUser.objects.values_list("public_id", "email"))
+        self.assertEqual(
+            [emails[UUID(profile["public_id"])] for profile in weighted],
+            [self.USER4_EMAIL, self.USER2_EMAIL, self.USER3_EMAIL],
+        )
+        self.assertEqual(self.client.get(url, {"scoring": "bogus"}).status_code, 400)
+
+
+class KeysetPaginationTests(MatchingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.users["user2"])
+        self.emails = dict(CustomUser.objects.values_list("public_id", "email"))
+
+    def walk(self, url, params):
+        """Follow ``next`` links one profile at a time and return the emails seen"""
+        emails = []
+        response = self.client.get(url, {**params, "page_size": 1}).json()
+        while True:
+            emails += [self.emails[UUID(profile["public_id"])] for profile in response["results"]]
+            if response["next"] is None:
+                return emails
+            response = self.client.get(response["next"]).json()
+
+    def test_common_interests_pages(self):
+        """Test walking cursors yields the full ranking once, on both the SQL and index paths"""
+        url = reverse("common-interests")
+        expected = [self.USER1_EMAIL, self.USER3_EMAIL, self.USER4_EMAIL]
+        self.assertEqual(self.walk(url, {}), expected)
+        self.assertEqual(self.walk(url, {"scoring": "weighted"}), expected)
+
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        with override_settings(MATCHING_INTEREST_INDEX=True):
+            self.assertEqual(self.walk(url, {}), expected)
+
+    def test_no_count_query(self):
+        """Test a page is fetched without counting the whole result set"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("common-interests"), {"page_size": 1})
+        self.assertFalse(any("COUNT(*)" in query["sql"] for query in queries))
+
+    def test_matching_profiles_pages(self):
+        """Test matching profiles are paginated by cursor instead of returned all at once"""
+        url = reverse("matching_profiles")
+        self.assertEqual(len(self.client.get(url, {"page_size": 3}).json()["results"]), 3)
+        self.assertEqual(sorted(self.walk(url, {})), sorted(self.emails.values()))
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected"""
+        response = self.client.get(reverse("common-interests"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_mistyped_cursor(self):
+        """Test a well-formed cursor holding values of the wrong type is rejected"""
+        paginator = KeysetPagination()
+        for url, values, params in (
+            (reverse("common-interests"), ["x", "y"], {}),
+            (reverse("common-interests"), [2, 3], {}),
+            (reverse("common-interests"), ["x", 2, "y"], {"scoring": "weighted"}),
+            (reverse("matching_profiles"), ["x"], {}),
+            (reverse("matching_profiles"), [True], {}),
+        ):
+            with self.subTest(url=url, values=values, **params):
+                cursor = paginator.encode_cursor(values)
+                response = self.client.get(url, {**params, "cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class QueryBudgetTests(MatchingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(5, 15):
+            user = cls.create_user(f"user{number}@test.com")
+            for interest in (cls.INTEREST_FOOTBALL, cls.INTEREST_ROCK):
+                UserInterest.objects.create(user=user, interest=cls.interests[interest])
+
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+
+    def test_matching_profiles(self):
+        """Test listing profiles costs the same number of queries for any page size"""
+        for page_size in (1, 14):
+            with self.assertNumQueries(2):
+                self.client.get(reverse("matching_profiles"), {"page_size": page_size})
+
+    def test_common_interests(self):
+        """Test every ranking path of common-interests stays within a fixed budget"""
+        url = reverse("common-interests")
+        with self.assertNumQueries(2):
+            self.client.get(url, {"page_size": 12})
+        with self.assertNumQueries(4):
+            self.client.get(url, {"page_size": 12, "scoring": "weighted"})
+
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        with override_settings(MATCHING_INTEREST_INDEX=True), self.assertNumQueries(2):
+            self.client.get(url, {"page_size": 12})
+
+    def test_public_profile(self):
+        """Test a single public profile is fetched with its interests in two queries"""
+        url = reverse("public-profile", args=[self.users["user2"].public_id])
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+@override_settings(MATCHING_SHARED_INTEREST_PAIRS=True)
+class SharedInterestPairTests(MatchingTestCase):
+    def setUp(self):
+        call_command("rebuild_shared_interest_pairs", stdout=StringIO())
+        self.client.force_authenticate(self.users["user1"])
+
+    def snapshot(self):
+        return set(
+            SharedInterestPair.objects.values_list(
+                "user_a__email", "user_b__email", "shared_count", "weighted_score"
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        call_command("rebuild_shared_interest_pairs", stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_rebuild(self):
+        """Test the rebuild stores both directions of every pair sharing an interest"""
+        user1_pairs = {(a, b, n) for a, b, n, _ in self.snapshot() if a == self.USER1_EMAIL}
+        self.assertEqual(
+            user1_pairs,
+            {(self.USER1_EMAIL, self.USER2_EMAIL, 2), (self.USER1_EMAIL, self.USER3_EMAIL, 1)},
+        )
+        self.assertEqual(len(self.snapshot()), 10)
+
+    def test_rebuild_in_place(self):
+        """Test a rebuild fixes drifted and stale pairs while keeping the others readable"""
+        fresh = self.snapshot()
+        SharedInterestPair.objects.filter(user_a=self.users["user1"]).update(shared_count=99)
+        SharedInterestPair.objects.create(
+            user_a=self.users["user1"], user_b=self.users["user4"], shared_count=1
+        )
+
+        batches = pairs.rebuild(batch_size=1)
+        next(batches)
+        # Only the first user's pairs have been recomputed so far
+        self.assertEqual(len(self.snapshot()), len(fresh))
+        for _ in batches:
+            pass
+        self.assertEqual(self.snapshot(), fresh)
+
+    def test_incremental_maintenance(self):
+        """Test single-row, bulk and importance writes keep the table equal to a rebuild"""
+        user4 = self.users["user4"]
+        UserInterest.objects.create(user=user4, interest=self.interests[self.INTEREST_FOOTBALL])
+        self.assertMatchesRebuild()
+
+        UserInterest.objects.filter(
+            user=self.users["user2"], interest__name=self.INTEREST_ROCK
+        ).delete()
+        self.assertMatchesRebuild()
+
+        self.client.post(
+            reverse("user_interests_bulk_update"),
+            {
+                "interest_ids": [
+                    self.interests[self.INTEREST_JAZZ].id,
+                    self.interests[self.INTEREST_ROCK].id,
+                ]
+            },
+            format="json",
+        )
+        self.assertMatchesRebuild()
+
+        UserInterestCategoryImportance.objects.create(
+            user=user4, category=self.categories[self.CATEGORY_MUSIC], importance=5
+        )
+        self.assertMatchesRebuild()
+
+        self.client.post(
+            reverse("user_interest_category_importances_bulk_update"),
+            {
+                "importances": {
+                    self.categories[self.CATEGORY_SPORTS].id: 4,
+                    self.categories[self.CATEGORY_MUSIC].id: 2,
+                }
+            },
+            format="json",
+        )
+        self.assertMatchesRebuild()
+
+    def test_endpoint_matches_sql_path(self):
+        """Test reading matches from the pair table gives the same pages as the SQL path"""
+        url = reverse("common-interests")
+        from_pairs = self.client.get(url).json()
+        with override_settings(MATCHING_SHARED_INTEREST_PAIRS=False):
+            from_sql = self.client.get(url).json()
+        self.assertEqual(from_pairs, from_sql)
+        self.assertEqual(len(from_pairs["results"]), 2)
+        with self.assertNumQueries(2):
+            self.client.get(url, {"scoring": "weighted"})
+
+
+@skipUnless(connection.vendor == "postgresql", "Interest arrays are PostgreSQL only")
+@override_settings(MATCHING_INTEREST_ARRAYS=True)
+class InterestSetTests(MatchingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+
+    def snapshot(self):
+        return dict(UserInterestSet.objects.values_list("user__email", "interest_ids"))
+
+    def assertMatchesBackfill(self):
+        incremental = self.snapshot()
+        call_command("backfill_interest_sets", stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_arrays_follow_interest_writes(self):
+        """Test single-row and bulk writes keep the arrays equal to a backfill"""
+        self.assertEqual(
+            sorted(self.snapshot()[self.USER1_EMAIL]),
+            sorted(
+                self.interests[name].id
+                for name in (self.INTEREST_FOOTBALL, self.INTEREST_BASKETBALL)
+            ),
+        )
+        UserInterest.objects.create(
+            user=self.users["user4"], interest=self.interests[self.INTEREST_FOOTBALL]
+        )
+        self.assertMatchesBackfill()
+
+        UserInterest.objects.filter(
+            user=self.users["user2"], interest__name=self.INTEREST_ROCK
+        ).delete()
+        self.assertMatchesBackfill()
+
+        self.client.post(
+            reverse("user_interests_bulk_update"),
+            {"interest_ids": [self.interests[self.INTEREST_JAZZ].id]},
+            format="json",
+        )
+        self.assertMatchesBackfill()
+
+        user4_id = self.users["user4"].id
+        CustomUser.objects.filter(id=user4_id).delete()
+        self.assertFalse(UserInterestSet.objects.filter(user_id=user4_id).exists())
+
+    def test_endpoint_matches_join_path(self):
+        """Test ranking by array overlap gives the same pages as joining UserInterest"""
+        url = reverse("common-interests")
+        with self.assertNumQueries(2):
+            from_arrays = self.client.get(url).json()
+        with override_settings(MATCHING_INTEREST_ARRAYS=False):
+            from_join = self.client.get(url).json()
+        self.assertEqual(from_arrays, from_join)
+        self.assertEqual(len(from_arrays["results"]), 2)
+
+
+@override_settings(MATCHING_LSH=True)
+class LSHTests(MatchingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+
+    def snapshot(self):
+        return sorted(MinHashBand.objects.values_list("user__email", "band", "bucket"))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        call_command("rebuild_minhash_bands", stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_bands_follow_interest_writes(self):
+        """Test single-row and bulk writes keep the bands equal to a rebuild"""
+        self.assertEqual(
+            MinHashBand.objects.filter(user=self.users["user1"]).count(),
+            settings.MATCHING_LSH_BANDS,
+        )
+        UserInterest.objects.create(
+            user=self.users["user4"], interest=self.interests[self.INTEREST_FOOTBALL]
+        )
+        self.assertMatchesRebuild()
+
+        UserInterest.objects.filter(user=self.users["user2"]).delete()
+        self.assertFalse(MinHashBand.objects.filter(user=self.users["user2"]).exists())
+        self.assertMatchesRebuild()
+
+        self.client.post(
+            reverse("user_interests_bulk_update"),
+            {"interest_ids": [self.interests[self.INTEREST_JAZZ].id]},
+            format="json",
+        )
+        self.assertMatchesRebuild()
+
+    def test_rebuild_in_place(self):
+        """Test a rebuild fixes drifted and stale bands while keeping the others readable"""
+        fresh = self.snapshot()
+        user1, user2 = self.users["user1"], self.users["user2"]
+        MinHashBand.objects.filter(user=user1).update(bucket=0)
+        MinHashBand.objects.create(user=user1, band=settings.MATCHING_LSH_BANDS, bucket=0)
+        MinHashBand.objects.create(user=self.create_user("lonely@test.com"), band=0, bucket=0)
+
+        batches = lsh.rebuild(batch_size=1)
+        next(batches)
+        # The other users' bands are still there, and may be refreshed concurrently
+        self.assertEqual(
+            MinHashBand.objects.filter(user=user2).count(), settings.MATCHING_LSH_BANDS
+        )
+        MinHashBand.objects.filter(user=user2).delete()
+        lsh.refresh_user(user2.id)
+        for _ in batches:
+            pass
+        self.assertEqual(self.snapshot(), fresh)
+
+    def test_endpoint_rescores_candidates_exactly(self):
+        """Test approximate matches carry exact shared counts in the exact order"""
+        # user2 shares both interests of user1, so they collide in every band
+        self.assertEqual(
+            lsh.rank_matches(self.users["user1"].id)[0],
+            (self.users["user2"].id, 2, self.USER2_EMAIL),
+        )
+        url = reverse("common-interests")
+        approximate = self.client.get(url).json()["results"]
+        with override_settings(MATCHING_LSH=False):
+            exact = self.client.get(url).json()["results"]
+        self.assertEqual(approximate, exact[: len(approximate)])
+
+    def test_recall_command(self):
+        """Test the recall evaluation finds every best match of the fixture users"""
+        output = StringIO()
+        call_command("evaluate_lsh_recall", "-k", "1", stdout=output)
+        self.assertIn("recall@1: mean 1.000", output.getvalue())
+
+
+class NeighborTests(MatchingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+
+    def computed(self):
+        return {
+            computed.user_id: neighbors.unpack(computed) for computed in UserNeighbors.objects.all()
+        }
+
+    def test_lists_match_exact_ranking(self):
+        """Test every list is the top of the exact join ranking, ties broken by email"""
+        call_command("compute_neighbors", "-k", "2", "--workers", "1", stdout=StringIO())
+        view = CommonInterestsUsersView()
+        expected = {}
+        for user in self.users.values():
+            ranking = list(
+                view.get_join_queryset(user).values_list("user_id", "shared_interests_count")[:2]
+            )
+            if ranking:
+                expected[user.id] = ranking
+        self.assertEqual(self.computed(), expected)
+
+    def test_worker_processes(self):
+        """Test chunks computed in worker processes give the same lists"""
+        call_command("compute_neighbors", "--chunk-size", "1", "--workers", "1", stdout=StringIO())
+        inline = self.computed()
+        call_command("compute_neighbors", "--chunk-size", "1", "--workers", "2", stdout=StringIO())
+        self.assertEqual(self.computed(), inline)
+
+    def test_endpoint_pages_through_list(self):
+        """Test the suggestions follow the stored order across pages"""
+        UserInterest.objects.filter(user=self.users["user1"]).delete()
+        call_command("compute_neighbors", "--workers", "1", stdout=StringIO())
+        url = reverse("suggested-users")
+        self.assertEqual(self.client.get(url).json(), {"next": None, "results": []})
+
+        UserInterest.objects.create(
+            user=self.users["user1"], interest=self.interests[self.INTEREST_ROCK]
+        )
+        call_command("compute_neighbors", "--workers", "1", stdout=StringIO())
+        expected = [self.users[name].public_id for name in ("user2", "user3", "user4")]
+        first = self.client.get(url, {"page_size": 2}).json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [UUID(profile["public_id"]) for profile in first["results"] + second["results"]],
+            expected,
+        )
+        self.assertIsNone(second["next"])
+
+
+@override_settings(MATCHING_CACHE_TIMEOUT=60)
+class MatchCacheTests(MatchingTestCase):
+    def setUp(self):
+        match_cache.cache.clear()
+        self.client.force_authenticate(self.users["user1"])
+        self.url = reverse("common-interests")
+
+    def assertCacheStatus(self, status, params=None):
+        response = self.client.get(self.url, params or {})
+        self.assertEqual(response.headers["X-Match-Cache"], status)
+        return response.json()
+
+    def test_ranking_round_trip(self):
+        """Test packed rankings decode to the same tuples, ints staying ints"""
+        for ranking in (
+            [],
+            [(3, 2, "a@test.com"), (1, 1, "b@test.com")],
+            [(3, 5.5, 2, "a@test.com")],
+        ):
+            self.assertEqual(decode_ranking(encode_ranking(ranking)), ranking)
+
+    def test_hit_after_miss(self):
+        """Test the second request is served from the cache with identical results"""
+        stats = match_cache.stats()
+        uncached = self.assertCacheStatus("miss")
+        with self.assertNumQueries(2):
+            cached = self.assertCacheStatus("hit")
+        self.assertEqual(cached, uncached)
+        self.assertEqual(
+            self.assertCacheStatus("miss", {"scoring": "weighted"})["results"][0],
+            cached["results"][0],
+        )
+        self.assertEqual(
+            match_cache.stats(), {"hits": stats["hits"] + 1, "misses": stats["misses"] + 2}
+        )
+        with override_settings(MATCHING_CACHE_TIMEOUT=0):
+            self.assertEqual(self.client.get(self.url).json(), uncached)
+
+    def test_invalidated_by_own_writes(self):
+        """Test the user's interest and importance endpoints drop their cached matches"""
+        writes = [
+            ("user_interests", {"interest_id": self.interests[self.INTEREST_ROCK].id}),
+            (
+                "user_interests_bulk_update",
+                {"interest_ids": [self.interests[self.INTEREST_JAZZ].id]},
+            ),
+            (
+                "user_interest_category_importances",
+                {"category": self.categories[self.CATEGORY_MUSIC].id, "importance": 4},
+            ),
+            (
+                "user_interest_category_importances_bulk_update",
+                {"importances": {self.categories[self.CATEGORY_SPORTS].id: 2}},
+            ),
+        ]
+        self.assertCacheStatus("miss")
+        for url_name, payload in writes:
+            self.assertCacheStatus("hit")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse(url_name), payload, format="json")
+            self.assertCacheStatus("miss")
+
+    def test_file_based_backend(self):
+        """Test entries survive a round trip through the file-based backend"""
+        with tempfile.TemporaryDirectory() as location:
+            backend = {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": location,
+            }
+            with override_settings(CACHES={"default": backend}):
+                uncached = self.assertCacheStatus("miss")
+                self.assertEqual(self.assertCacheStatus("hit"), uncached)
+
+
+class PublicProfileExportTests(MatchingTestCase):
+    def setUp(self):
+        self.url = reverse("public-profile-export")
+        self.staff = CustomUser.objects.create_user(
+            email="staff@test.com", password="testpass123", is_staff=True
+        )
+        self.client.force_authenticate(self.staff)
+
+    def expected_lines(self):
+        profiles = UserProfile.objects.with_public_data().order_by("id")
+        return [
+            json.loads(json.dumps(PublicProfileSerializer(profile).data, default=str))
+            for profile in profiles
+        ]
+
+    def test_streams_ndjson_in_chunks(self):
+        """Test every profile is one line, with one query per chunk for interests"""
+        with patch.object(PublicProfileExportView, "chunk_size", 3):
+            response = self.client.get(self.url)
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            # Profiles with their users, then two chunks of interests
+            with self.assertNumQueries(3):
+                content = b"".join(response.streaming_content)
+        lines = content.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected_lines())
+
+    def test_gzip(self):
+        """Test the stream is gzipped for clients accepting it"""
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        content = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(
+            [json.loads(line) for line in content.decode().splitlines()], self.expected_lines()
+        )
+
+    async def test_streams_under_asgi(self):
+        """Test ASGI servers get an async body, read one chunk at a time"""
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.staff).access_token))()
+        with patch.object(PublicProfileExportView, "chunk_size", 3):
+            response = await self.async_client.get(
+                self.url, headers={"Authorization": f"Bearer {token}"}
+            )
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response]
+        self.assertEqual(len(chunks), 2)
+        lines = b"".join(chunks).decode().splitlines()
+        expected = await sync_to_async(self.expected_lines)()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_staff_only(self):
+        """Test users without staff status can't export profiles"""
+        self.client.force_authenticate(self.users["user1"])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class AgeFilterTests(MatchingTestCase):
+    def setUp(self):
+        today = date.today()
+        # user2 turns 30 tomorrow, user3 turned 40 today, user4 has no birth date
+        UserProfile.objects.filter(user=self.users["user2"]).update(
+            birth_date=years_before(today, 30) + timedelta(days=1)
+        )
+        UserProfile.objects.filter(user=self.users["user3"]).update(
+            birth_date=years_before(today, 40)
+        )
+        self.client.force_authenticate(self.users["user1"])
+
+    def matched_emails(self, url_name, **params):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        emails = {
+            profile.user.public_id: profile.user.email for profile in UserProfile.objects.all()
+        }
+        return [emails[UUID(profile["public_id"])] for profile in response.json()["results"]]
+
+    def test_age_annotation(self):
+        """Test ages computed in SQL count whole years, birthdays and leap days included"""
+        today = date(2024, 3, 1)
+        births = {
+            "user1": date(2000, 2, 29),
+            "user2": date(2000, 3, 1),
+            "user3": date(2000, 3, 2),
+            "user4": None,
+        }
+        for user, birth_date in births.items():
+            UserProfile.objects.filter(user=self.users[user]).update(birth_date=birth_date)
+        ages = dict(UserProfile.objects.with_age(today).values_list("user__email", "age"))
+        self.assertEqual(
+            ages,
+            {
+                self.USER1_EMAIL: 24,
+                self.USER2_EMAIL: 24,
+                self.USER3_EMAIL: 23,
+                self.USER4_EMAIL: None,
+            },
+        )
+        profiles = UserProfile.objects.aged_between(24, 24, today)
+        self.assertEqual(
+            sorted(profiles.values_list("user__email", flat=True)),
+            [self.USER1_EMAIL, self.USER2_EMAIL],
+        )
+
+    def test_public_profile_age(self):
+        """Test public profiles report the SQL age"""
+        response = self.client.get(reverse("public-profile", args=[self.users["user2"].public_id]))
+        self.assertEqual(response.json()["age"], 29)
+
+    def test_common_interests_filter(self):
+        """Test every ranking path keeps only the matches within the age range"""
+        self.assertEqual(self.matched_emails("common-interests", min_age=30), [self.USER3_EMAIL])
+        self.assertEqual(self.matched_emails("common-interests", max_age=29), [self.USER2_EMAIL])
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        with override_settings(MATCHING_INTEREST_INDEX=True):
+            self.assertEqual(
+                self.matched_emails("common-interests", min_age=30, max_age=40),
+                [self.USER3_EMAIL],
+            )
+        match_cache.cache.clear()
+        with override_settings(MATCHING_CACHE_TIMEOUT=60):
+            self.assertEqual(
+                self.matched_emails("common-interests"), [self.USER2_EMAIL, self.USER3_EMAIL]
+            )
+            self.assertEqual(
+                self.matched_emails("common-interests", max_age=29), [self.USER2_EMAIL]
+            )
+
+    @override_settings(MATCHING_INTEREST_INDEX=True)
+    def test_filtered_ranking_pages(self):
+        """Test pages of a filtered ranking are full and chain through the cursor"""
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        response = self.client.get(reverse("common-interests"), {"max_age": 40, "page_size": 1})
+        first = response.json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [first["results"][0]["public_id"], second["results"][0]["public_id"]],
+            [str(self.users["user2"].public_id), str(self.users["user3"].public_id)],
+        )
+        self.assertIsNone(second["next"])
+        response = self.client.get(reverse("common-interests"), {"min_age": 30, "page_size": 1})
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertIsNone(response.json()["next"])
+
+    def test_matching_profiles_filter(self):
+        """Test matching profiles are filtered by age, excluding unknown birth dates"""
+        self.assertEqual(
+            self.matched_emails("matching_profiles", min_age=29, max_age=39),
+            [self.USER2_EMAIL],
+        )
+        self.assertEqual(len(self.matched_emails("matching_profiles")), 4)
+
+    def test_age_follows_date(self):
+        """Test matching profiles compute ages on the date of each request"""
+
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=1)
+
+        def user2_age():
+            response = self.client.get(reverse("matching_profiles"))
+            public_id = str(self.users["user2"].public_id)
+            return next(
+                profile["age"]
+                for profile in response.json()["results"]
+                if profile["public_id"] == public_id
+            )
+
+        self.assertEqual(user2_age(), 29)
+        with patch("core.models.date", Tomorrow):
+            self.assertEqual(user2_age(), 30)
+
+    def test_invalid_range(self):
+        """Test malformed and inverted age ranges are rejected"""
+        for params in ({"min_age": "old"}, {"max_age": -1}, {"min_age": 40, "max_age": 30}):
+            for url_name in ("common-interests", "matching_profiles"):
+                response = self.client.get(reverse(url_name), params)
+                self.assertEqual(response.status_code, 400)
+
+
+class PublicProfileDataTests(MatchingTestCase):
+    def test_matches_serializer(self):
+        """Test profiles built from values rows render exactly like the serializer's"""
+        UserProfile.objects.filter(user=self.users["user1"]).update(
+            bio="Héllo\u2028", birth_date=date(1990, 2, 28)
+        )
+        UserProfile.objects.filter(user=self.users["user2"]).update(birth_date=date(2000, 12, 31))
+        profiles = UserProfile.objects.order_by("-id")
+        serialized = PublicProfileSerializer(profiles.with_public_data(), many=True).data
+        with self.assertNumQueries(2):
+            data = public_profile_data(profiles.with_age().values_list(*PUBLIC_PROFILE_FIELDS))
+        self.assertEqual(list(data), [profile.user_id for profile in profiles])
+        self.assertEqual(
+            JSONRenderer().render(list(data.values())), JSONRenderer().render(serialized)
+        )
+
+
+class SharedInterestsTests(MatchingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+        football, basketball = (
+            {"id": self.interests[name].id, "name": name}
+            for name in (self.INTEREST_FOOTBALL, self.INTEREST_BASKETBALL)
+        )
+        self.expected = [[football, basketball], [football]]
+
+    def shared_interests(self, **params):
+        with self.assertNumQueries(4 if params.get("scoring") == "weighted" else 2):
+            response = self.client.get(reverse("common-interests"), params)
+        return [profile["shared_interests"] for profile in response.json()["results"]]
+
+    def test_every_ranking_path(self):
+        """Test each match lists the interests shared with the requester, in a fixed budget"""
+        self.assertEqual(self.shared_interests(), self.expected)
+        self.assertEqual(self.shared_interests(scoring="weighted"), self.expected)
+        interest_index.build()
+        self.addCleanup(interest_index.clear)
+        with override_settings(MATCHING_INTEREST_INDEX=True):
+            self.assertEqual(self.shared_interests(), self.expected)
+
+    def test_matches_serializer(self):
+        """Test matches built from values rows render exactly like MatchSerializer's"""
+        requester = self.users["user1"].id
+        profiles = UserProfile.objects.exclude(user_id=requester).order_by("id")
+        serialized = MatchSerializer(profiles.with_public_data(shared_with=requester), many=True)
+        data = public_profile_data(
+            profiles.with_age().values_list(*PUBLIC_PROFILE_FIELDS), shared_with=requester
+        )
+        self.assertEqual(
+            JSONRenderer().render(list(data.values())), JSONRenderer().render(serialized.data)
+        )
+
+
+class PublicProfileBatchTests(MatchingTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.users["user1"])
+        self.url = reverse("public-profile-batch")
+
+    def test_batch_keeps_order_and_reports_missing(self):
+        """Test profiles come back in request order in two queries, unknown ids listed apart"""
+        unknown = uuid4()
+        public_ids = [
+            str(self.users["user3"].public_id),
+            str(unknown),
+            str(self.users["user1"].public_id),
+        ]
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {"public_ids": public_ids}, format="json")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [profile["public_id"] for profile in body["results"]],
+            [public_ids[0], public_ids[2]],
+        )
+        self.assertEqual(body["missing"], [str(unknown)])
+        single = self.client.get(reverse("public-profile", args=[self.users["user3"].public_id]))
+        self.assertEqual(body["results"][0], single.json())
+
+    def test_batch_size_is_bounded(self):
+        """Test empty and oversized batches are rejected"""
+        for public_ids in ([], [str(uuid4()) for _ in range(301)]):
+            response = self.client.post(self.url, {"public_ids": public_ids}, format="json")
+            self.assertEqual(response.status_code, 400)
+
+
+class AsyncViewTests(MatchingTestCase):
+    def setUp(self):
+        self.token = str(RefreshToken.for_user(self.users["user1"]).access_token)
+        self.client.force_authenticate(self.users["user1"])
+
+    async def aget(self, url_name, *args, **params):
+        return await self.async_client.get(
+            reverse(url_name, args=args), params, headers={"Authorization": f"Bearer {self.token}"}
+        )
+
+    async def test_public_profile(self):
+        """Test the async public profile matches the sync one, 404 included"""
+        public_id = self.users["user2"].public_id
+        response = await self.aget("public-profile-async", public_id)
+        sync_response = await sync_to_async(self.client.get)(
+            reverse("public-profile", args=[public_id])
+        )
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual((await self.aget("public-profile-async", uuid4())).status_code, 404)
+
+    async def test_common_interests(self):
+        """Test the async common-interests pages like the sync one on the SQL and index paths"""
+        sync_response = await sync_to_async(self.client.get)(
+            reverse("common-interests"), {"page_size": 1}
+        )
+        response = await self.aget("common-interests-async", page_size=1)
+        self.assertEqual(response.json()["results"], sync_response.json()["results"])
+        self.assertIsNotNone(response.json()["next"])
+
+        await sync_to_async(interest_index.build)()
+        self.addCleanup(interest_index.clear)
+        with override_settings(MATCHING_INTEREST_INDEX=True):
+            from_index = await self.aget("common-interests-async", page_size=1)
+        self.assertEqual(from_index.json(), response.json())
+
+    async def test_common_interests_modes(self):
+        """Test scoring, age ranges and invalid parameters give the sync view's responses"""
+        await UserProfile.objects.filter(user=self.users["user2"]).aupdate(
+            birth_date=years_before(date.today(), 30)
+        )
+        await sync_to_async(interest_index.build)()
+        self.addCleanup(interest_index.clear)
+        for index in (False, True):
+            for params in (
+                {"scoring": "weighted", "page_size": 1},
+                {"min_age": 25, "max_age": 35},
+                {"max_age": 0},
+                {"scoring": "bogus"},
+                {"min_age": "old"},
+            ):
+                with self.subTest(index=index, **params), override_settings(
+                    MATCHING_INTEREST_INDEX=index
+                ):
+                    response = await self.aget("common-interests-async", **params)
+                    sync_response = await sync_to_async(self.client.get)(
+                        reverse("common-interests"), params
+                    )
+                    self.assertEqual(response.status_code, sync_response.status_code)
+                    body, sync_body = response.json(), sync_response.json()
+                    if response.status_code == 200:
+                        # Same cursor, on each view's own URL
+                        body["next"] = body["next"] and body["next"].replace("/async", "")
+                    self.assertEqual(body, sync_body)
+
+    async def test_catalog(self):
+        """Test the async catalog lists serve the shared cached payload"""
+        response = await self.async_client.get(reverse("interest_list_async"))
+        sync_response = await sync_to_async(self.client.get)(reverse("interest_list"))
+        self.assertEqual(response.content, sync_response.content)
+        self.assertEqual(response.headers["ETag"], sync_response.headers["ETag"])
+
+    async def test_requires_valid_token(self):
+        """Test missing and invalid tokens are rejected like DRF does"""
+        response = await self.async_client.get(reverse("common-interests-async"))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            reverse("common-interests-async"), headers={"Authorization": "Bearer nope"}
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
@@ -1,5 +1,13 @@
 from django.urls import path
-from .views import MatchingProfilesView, PublicProfileView, CommonInterestsUsersView
+from .async_views import AsyncCommonInterestsUsersView, AsyncPublicProfileView
+from .views import (
+    MatchingProfilesView,
+    PublicProfileView,
+    PublicProfileBatchView,
+    PublicProfileExportView,
+    CommonInterestsUsersView,
+    SuggestedUsersView,
+)
 
 urlpatterns = [
     path("matching-profiles/", MatchingProfilesView.as_view(), name="matching_profiles"),
@@ -8,9 +16,30 @@ urlpatterns = [
         PublicProfileView.as_view(),
         name="public-profile",
     ),
+    path(
+        "users/public-profiles/batch/",
+        PublicProfileBatchView.as_view(),
+        name="public-profile-batch",
+    ),
+    path(
+        "users/public-profiles/export/",
+        PublicProfileExportView.as_view(),
+        name="public-profile-export",
+    ),
     path(
         "users/common-interests/",
         CommonInterestsUsersView.as_view(),
         name="common-interests",
     ),
+    path("users/suggested/", SuggestedUsersView.as_view(), name="suggested-users"),
+    path(
+        "async/users/<uuid:user_id>/public-profile/",
+        AsyncPublicProfileView.as_view(),
+        name="public-profile-async",
+    ),
+    path(
+        "async/users/common-interests/",
+        AsyncCommonInterestsUsersView.as_view(),
+        name="common-interests-async",
+    ),
 ]
@@ -1,54 +1,194 @@
-from typing import Union
+from typing import Sequence, Union
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q
+from django.utils.cache import patch_vary_headers
+from django.db.models import Count, F, Q
 from rest_framework import generics, permissions
-from rest_framework.pagination import PageNumberPagination
-from core.models import CustomUser, Interest, UserProfile
-from .serializers import PublicProfileSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.authentication import AuthenticatedUser, StatelessJWTAuthentication
+from core.models import Interest, UserProfile
+from core.replicas import ReplicaReadsMixin
+from . import interest_sets, lsh, neighbors
+from .cache import match_cache
+from .export import aiterate, gzip_stream, profile_lines
+from .filters import AgeRangeFilter
+from .index import interest_index
+from .pagination import (
+    CommonInterestsPagination,
+    NeighborPagination,
+    ProfilePagination,
+    WeightedCommonInterestsPagination,
+)
+from .scoring import SCORING_SHARED, SCORING_WEIGHTED, rank_weighted_matches
+from .models import UserNeighbors
+from .serializers import (
+    PUBLIC_PROFILE_FIELDS,
+    MatchSerializer,
+    PublicProfileBatchSerializer,
+    PublicProfileSerializer,
+    public_profile_data,
+)
 
 
-class MatchingProfilesView(generics.ListAPIView):
+class MatchingProfilesView(ReplicaReadsMixin, generics.ListAPIView):
     serializer_class = PublicProfileSerializer
-    queryset = UserProfile.objects.all()
+    pagination_class = ProfilePagination
+    filter_backends = (AgeRangeFilter,)
 
+    def get_queryset(self):
+        # Built per request: the age annotation holds today's date
+        return UserProfile.objects.with_public_data()
+
+
+class PublicProfileExportView(APIView):
+    """
+    Stream every public profile as newline-delimited JSON, for staff tools
+    that need a full dump. Compressed with gzip when the client accepts it.
+    Under ASGI the body is an async iterator: Django would otherwise read a
+    sync one whole before sending it.
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    chunk_size = 2000
 
-class PublicProfileView(generics.RetrieveAPIView):
+    def get(self, request):
+        lines = profile_lines(self.chunk_size)
+        gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+        body = gzip_stream(lines) if gzipped else lines
+        if isinstance(request._request, ASGIRequest):
+            body = aiterate(body)
+        response = StreamingHttpResponse(body, content_type="application/x-ndjson")
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+
+class PublicProfileView(ReplicaReadsMixin, generics.RetrieveAPIView):
     serializer_class = PublicProfileSerializer
+    authentication_classes = (StatelessJWTAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         user_id = self.kwargs.get("user_id")
-        return get_object_or_404(
-            UserProfile.objects.select_related("user").prefetch_related(
-                "user__user_interests__interest__category"
-            ),
-            user__public_id=user_id,
+        return get_object_or_404(UserProfile.objects.with_public_data(), user__public_id=user_id)
+
+
+class PublicProfileBatchView(generics.GenericAPIView):
+    """
+    Public profiles of many users at once, in request order. Unknown ids are
+    listed under ``missing`` instead of failing the whole batch.
+    """
+
+    serializer_class = PublicProfileBatchSerializer
+    authentication_classes = (StatelessJWTAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        public_ids = serializer.validated_data["public_ids"]
+
+        rows = (
+            UserProfile.objects.with_age()
+            .filter(user__public_id__in=public_ids)
+            .values_list(*PUBLIC_PROFILE_FIELDS)
+        )
+        profiles = {profile["public_id"]: profile for profile in public_profile_data(rows).values()}
+        return Response(
+            {
+                "results": [
+                    profiles[str(public_id)]
+                    for public_id in public_ids
+                    if str(public_id) in profiles
+                ],
+                "missing": [
+                    public_id for public_id in public_ids if str(public_id) not in profiles
+                ],
+            }
         )
 
 
-class CommonInterestsUsersView(generics.ListAPIView):
-    serializer_class = PublicProfileSerializer
+class RankedListAPIView(generics.ListAPIView):
+    """List view whose results come ranked from elsewhere than a queryset."""
+
+    # List the interests every result shares with the requester
+    shared_interests = False
+
+    def list_ranked(self, ranked: Sequence[tuple], keep=None):
+        """
+        Serialize an already ranked list of ``(user_id, *ordering values)``
+        tuples, only loading the profiles that end up on the requested page.
+        ``keep`` optionally filters the matches, see ``paginate_ranked``.
+        """
+        assert self.paginator is not None
+        page = self.paginator.paginate_ranked(
+            ranked, self.request, key=lambda match: match[1:], keep=keep
+        )
+        user_ids = [match[0] for match in page]
+        profiles = public_profile_data(
+            UserProfile.objects.with_age()
+            .filter(user_id__in=user_ids)
+            .values_list(*PUBLIC_PROFILE_FIELDS),
+            shared_with=self.request.user.id if self.shared_interests else None,
+        )
+        return self.get_paginated_response(
+            [profiles[user_id] for user_id in user_ids if user_id in profiles]
+        )
+
+
+class CommonInterestsUsersView(ReplicaReadsMixin, RankedListAPIView):
+    serializer_class = MatchSerializer
+    shared_interests = True
+    # Only request.user.id is needed, which the token carries
+    authentication_classes = (StatelessJWTAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
-    pagination_class = PageNumberPagination
-    page_size = 10
+    # Applied in SQL when ranking in the database, to the ranking otherwise
+    filter_backends = (AgeRangeFilter,)
+
+    SCORING_SHARED = SCORING_SHARED
+    SCORING_WEIGHTED = SCORING_WEIGHTED
+
+    scoring = SCORING_SHARED
+
+    @property
+    def pagination_class(self):
+        if self.scoring == self.SCORING_WEIGHTED:
+            return WeightedCommonInterestsPagination
+        return CommonInterestsPagination
 
     def get_queryset(self):
-        user: Union[CustomUser, AnonymousUser] = self.request.user
+        user: Union[AuthenticatedUser, AnonymousUser] = self.request.user
         if isinstance(user, AnonymousUser):
             return UserProfile.objects.none()
 
+        if settings.MATCHING_SHARED_INTEREST_PAIRS:
+            return self.get_pairs_queryset(user)
+        if interest_sets.enabled():
+            return interest_sets.matches_queryset(user.id)
+        return self.get_join_queryset(user)
+
+    def get_join_queryset(self, user: AuthenticatedUser):
+        """Count shared interests by joining ``UserInterest`` for every candidate."""
         return (
-            UserProfile.objects.exclude(user_id=user.id)
+            UserProfile.objects.with_public_data(shared_with=user.id)
+            .exclude(user_id=user.id)
             .filter(
-                user__user_interests__interest__in=Interest.objects.filter(userinterest__user=user)
+                user__user_interests__interest__in=Interest.objects.filter(
+                    userinterest__user_id=user.id
+                )
             )
             .annotate(
                 shared_interests_count=Count(
                     "user__user_interests",
                     filter=Q(
                         user__user_interests__interest__in=Interest.objects.filter(
-                            userinterest__user=user
+                            userinterest__user_id=user.id
                         )
                     ),
                 )
@@ -57,3 +197,96 @@ class CommonInterestsUsersView(generics.ListAPIView):
             .order_by("-shared_interests_count", "user__email")
             .distinct()
         )
+
+    def get_pairs_queryset(self, user: AuthenticatedUser):
+        """
+        Read matches from the materialized ``SharedInterestPair`` rows of
+        ``user``: one range scan over its ``(user_a, score)`` index.
+        """
+        return (
+            UserProfile.objects.with_public_data(shared_with=user.id)
+            .filter(user__interest_pairs_with__user_a_id=user.id)
+            .annotate(
+                shared_interests_count=F("user__interest_pairs_with__shared_count"),
+                score=F("user__interest_pairs_with__weighted_score"),
+            )
+            .order_by("-shared_interests_count", "user__email")
+        )
+
+    @classmethod
+    def get_scoring(cls, query_params) -> str:
+        scoring = query_params.get("scoring", cls.SCORING_SHARED)
+        if scoring not in (cls.SCORING_SHARED, cls.SCORING_WEIGHTED):
+            raise ValidationError(
+                {"scoring": f"Expected one of: {cls.SCORING_SHARED}, {cls.SCORING_WEIGHTED}."}
+            )
+        return scoring
+
+    def list(self, request, *args, **kwargs):
+        self.scoring = self.get_scoring(request.query_params)
+
+        use_index = settings.MATCHING_INTEREST_INDEX and interest_index.ensure_warm()
+        if match_cache.enabled:
+            ranked, hit = match_cache.get_or_compute(
+                request.user.id, self.scoring, lambda: self.rank_matches(use_index)
+            )
+            # Cached unfiltered, so that every age range can be served from it
+            response = self.list_ranked(ranked, AgeRangeFilter().ranked_filter(request))
+            response["X-Match-Cache"] = "hit" if hit else "miss"
+            return response
+
+        if self.ranks_in_database(use_index):
+            return super().list(request, *args, **kwargs)
+        return self.list_ranked(
+            self.rank_matches(use_index), AgeRangeFilter().ranked_filter(request)
+        )
+
+    @property
+    def approximate(self) -> bool:
+        """Whether the shared-count ranking comes from MinHash LSH candidates."""
+        return settings.MATCHING_LSH and self.scoring == self.SCORING_SHARED
+
+    def ranks_in_database(self, use_index: bool) -> bool:
+        if settings.MATCHING_SHARED_INTEREST_PAIRS:
+            return True
+        if self.approximate:
+            return False
+        return self.scoring == self.SCORING_SHARED and not use_index
+
+    def rank_matches(self, use_index: bool) -> Sequence[tuple]:
+        """
+        Compute the complete ranking for the current scoring mode, as
+        ``(user_id, *ordering values)`` tuples.
+        """
+        user = self.request.user
+        if self.ranks_in_database(use_index):
+            assert self.paginator is not None
+            fields = [field.lstrip("-") for field in self.paginator.ordering]
+            return list(
+                self.get_queryset()
+                .order_by(*self.paginator.ordering)
+                .values_list("user_id", *fields)
+            )
+        if self.scoring == self.SCORING_WEIGHTED:
+            return rank_weighted_matches(user, interest_index if use_index else None)
+        if self.approximate:
+            return lsh.rank_matches(user.id)
+        return interest_index.top_matches(user.id)
+
+
+class SuggestedUsersView(ReplicaReadsMixin, RankedListAPIView):
+    """
+    The requester's precomputed nearest neighbors, as last written by the
+    ``compute_neighbors`` job. Users without a computed list get no results.
+    """
+
+    serializer_class = PublicProfileSerializer
+    # Only request.user.id is needed, which the token carries
+    authentication_classes = (StatelessJWTAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = NeighborPagination
+
+    def list(self, request, *args, **kwargs):
+        computed = UserNeighbors.objects.filter(user_id=request.user.id).first()
+        ranked = neighbors.unpack(computed) if computed else []
+        return self.list_ranked([(user_id, rank) for rank, (user_id, _) in enumerate(ranked)])